@@ -0,0 +1,167 @@
+"""Проверка планов запросов лент на большом наборе данных.
+
+Заполняет временную SQLite-базу (по умолчанию миллион постов), выводит
+EXPLAIN для запросов лент и комментариев и проверяет, что каждый из них
+идёт по составному индексу без сортировки во временном B-дереве.
+
+    python benchmarks/explain_feeds.py
+    python benchmarks/explain_feeds.py --posts 100000 --keep db.sqlite3
+"""
+import argparse
+import datetime as dt
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BATCH_SIZE = 50000
+
+
+def setup_django(database):
+    os.environ["YATUBE_DB_PROFILE"] = "sqlite"
+    os.environ["YATUBE_DB_NAME"] = database
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+    sys.path.insert(0, BASE_DIR)
+    import django
+    django.setup()
+
+
+def insert_rows(cursor, table, columns, rows):
+    from posts.management.commands.generate_data import adapt_row
+
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        table, ", ".join(columns), ", ".join(["%s"] * len(columns)))
+    batch = []
+    for row in rows:
+        batch.append(adapt_row(row))
+        if len(batch) == BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+
+
+def seed(args):
+    from django.db import connection, transaction
+
+    from posts.models import Comment, Follow, Group, Post, User
+
+    users = [User(username="user{}".format(number), password="!")
+             for number in range(args.users)]
+    User.objects.bulk_create(users)
+    user_ids = list(User.objects.values_list("id", flat=True))
+    Group.objects.bulk_create(
+        [Group(title="Группа {}".format(number),
+               slug="group-{}".format(number), description="")
+         for number in range(args.groups)])
+    group_ids = list(Group.objects.values_list("id", flat=True))
+    start = dt.datetime(2020, 1, 1, tzinfo=dt.timezone.utc)
+
+    def posts():
+        for number in range(args.posts):
+            date = start + dt.timedelta(seconds=number * 7)
+            yield ("Пост {}".format(number), date, random.choice(user_ids),
+                   random.choice(group_ids + [None]), "", 0, date, "")
+
+    def comments():
+        for number in range(args.posts // 2):
+            date = start + dt.timedelta(seconds=number * 13)
+            yield (random.randint(1, args.posts), random.choice(user_ids),
+                   "Комментарий", date)
+
+    def follows():
+        seen = set()
+        for user_id in user_ids:
+            for author_id in random.sample(user_ids, args.follows):
+                if author_id != user_id and (user_id, author_id) not in seen:
+                    seen.add((user_id, author_id))
+                    yield user_id, author_id
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        insert_rows(cursor, Post._meta.db_table,
+                    ["text", "pub_date", "author_id", "group_id", "image",
+                     "comments_count", "updated", "thumbnails"], posts())
+        insert_rows(cursor, Comment._meta.db_table,
+                    ["post_id", "author_id", "text", "created"], comments())
+        insert_rows(cursor, Follow._meta.db_table,
+                    ["user_id", "author_id"], follows())
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def feed_queries():
+    from posts import feeds
+    from posts.models import Follow, Group, Post, User
+    from posts.paginators import KeysetPaginator, decode_cursor, encode_cursor
+
+    user = User.objects.order_by("?").first()
+    group = Group.objects.first()
+    post = Post.objects.order_by("-comments_count").first()
+    middle_index = Post.objects.count() // 2
+    middle = Post.objects.order_by("-pub_date", "-id")[middle_index]
+    seek = KeysetPaginator(None, 10)._seek(
+        decode_cursor(encode_cursor(middle)), "lt")
+    ordering = ("-pub_date", "-id")
+    return [
+        ("index", "post_date",
+         feeds.index_feed().order_by(*ordering)[:11]),
+        ("index ?after=", "post_date",
+         feeds.index_feed().filter(seek).order_by(*ordering)[:11]),
+        ("group", "post_group_date",
+         feeds.group_feed(group).order_by(*ordering)[:11]),
+        ("profile", "post_author_date",
+         feeds.profile_feed(user).order_by(*ordering)[:11]),
+        ("profile ?after=", "post_author_date",
+         feeds.profile_feed(user).filter(seek).order_by(*ordering)[:11]),
+        ("comments", "comment_post_created",
+         feeds.post_comments(post).order_by("-created", "-id")[:50]),
+        ("followers", "follow_author_user",
+         Follow.objects.filter(author=user).values_list("user_id")),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--follows", type=int, default=20)
+    parser.add_argument("--keep", help="Сохранить базу по этому пути.")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        database = args.keep or os.path.join(directory, "explain.sqlite3")
+        failures = explain(args, database)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    sys.exit(1 if failures else 0)
+
+
+def explain(args, database):
+    setup_django(database)
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+    started = time.perf_counter()
+    seed(args)
+    print("Заполнено за {:.1f} с".format(time.perf_counter() - started))
+
+    failures = 0
+    for name, index, queryset in feed_queries():
+        plan = queryset.explain()
+        started = time.perf_counter()
+        list(queryset)
+        elapsed = (time.perf_counter() - started) * 1000
+        ok = index in plan and "TEMP B-TREE" not in plan
+        failures += not ok
+        print("\n[{}] {} ({:.2f} мс)\n{}".format(
+            "OK" if ok else "FAIL", name, elapsed, plan))
+    return failures
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Рендеринг главных страниц с обычным и кэширующим загрузчиком шаблонов.
+
+Во временной SQLite-базе создаются синтетические данные, затем главная
+лента (posts/index.html), профиль (posts/profile.html) и страница поста
+(posts/post.html) запрашиваются через ``django.test.Client`` с каждым
+набором загрузчиков. Кэш фрагментов отключён, чтобы каждый запрос
+рендерил шаблон целиком. Отдельно замеряется загрузка и компиляция
+самих шаблонов через ``get_template``.
+
+    python benchmarks/render_templates.py --repeat 200
+"""
+import argparse
+import copy
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = (
+    ("index", "posts/index.html"),
+    ("profile", "posts/profile.html"),
+    ("post", "posts/post.html"),
+)
+DATA = {"users": 50, "posts": 500, "comments": 1000, "groups": 5,
+        "images": 0}
+
+
+def setup_django(database):
+    os.environ["YATUBE_DB_PROFILE"] = "sqlite"
+    os.environ["YATUBE_DB_NAME"] = database
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+    sys.path.insert(0, BASE_DIR)
+    import django
+    django.setup()
+
+
+def loader_settings():
+    """``{режим: TEMPLATES}`` для загрузчиков по умолчанию и кэширующего."""
+    from django.conf import settings
+
+    cached = copy.deepcopy(settings.TEMPLATES)
+    cached[0]["APP_DIRS"] = False
+    cached[0]["OPTIONS"]["loaders"] = [
+        ("django.template.loaders.cached.Loader", [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ]),
+    ]
+    return {"uncached": settings.TEMPLATES, "cached": cached}
+
+
+def page_urls():
+    from django.urls import reverse
+
+    from posts.models import Post
+
+    post = Post.objects.order_by("-comments_count").first()
+    return {
+        "index": reverse("index"),
+        "profile": reverse("profile", args=[post.author.username]),
+        "post": reverse("post", args=[post.author.username, post.id]),
+    }
+
+
+def server_timing(response, name):
+    for metric in response["Server-Timing"].split(","):
+        key, _, value = metric.strip().partition(";dur=")
+        if key == name:
+            return float(value.split(";")[0])
+    return 0.0
+
+
+def measure_page(client, url, repeat):
+    client.get(url)
+    totals, renders = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url)
+        totals.append((time.perf_counter() - started) * 1000)
+        renders.append(server_timing(response, "tpl"))
+    return statistics.median(totals), statistics.median(renders)
+
+
+def measure_compile(name, repeat):
+    from django.template import engines
+
+    engine = engines["django"]
+    engine.get_template(name)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        engine.get_template(name)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(os.path.join(directory, "render.sqlite3"))
+        from django.core.management import call_command
+        from django.test import Client, override_settings
+
+        call_command("migrate", verbosity=0)
+        with open(os.devnull, "w") as devnull:
+            call_command("generate_data", stdout=devnull, seed=args.seed,
+                         **DATA)
+        urls = page_urls()
+        client = Client()
+        dummy_cache = {"default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }}
+
+        results = {}
+        for mode, templates in loader_settings().items():
+            with override_settings(TEMPLATES=templates, CACHES=dummy_cache,
+                                   VIEW_BUDGETS={}):
+                for page, template in PAGES:
+                    total, render = measure_page(client, urls[page],
+                                                 args.repeat)
+                    compiled = measure_compile(template, args.repeat)
+                    results[mode, page] = (total, render, compiled)
+
+    print("{:<10}{:<10}{:>12}{:>12}{:>14}".format(
+        "page", "loader", "total ms", "tpl ms", "get_template"))
+    for page, template in PAGES:
+        for mode in ("uncached", "cached"):
+            total, render, compiled = results[mode, page]
+            print("{:<10}{:<10}{:>12.2f}{:>12.2f}{:>14.3f}".format(
+                page, mode, total, render, compiled))
+        speedup = results["uncached", page][0] / results["cached", page][0]
+        print("{:<10}{:<10}{:>11.2f}x".format(page, "speedup", speedup))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Нагрузочный тест: чтение лент во время записи комментариев.
+
+Сравнивает пропускную способность чтения для профилей базы ``dev``
+(SQLite по умолчанию) и ``sqlite`` (WAL и PRAGMA из settings). Каждый
+профиль запускается в отдельном процессе на свежей временной базе.
+
+    python benchmarks/sqlite_wal_load.py
+    python benchmarks/sqlite_wal_load.py --seconds 20 --readers 8
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES = ("dev", "sqlite")
+
+
+def setup_django(profile, database):
+    os.environ["YATUBE_DB_PROFILE"] = profile
+    os.environ["YATUBE_DB_NAME"] = database
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+    sys.path.insert(0, BASE_DIR)
+    import django
+    django.setup()
+
+
+def run_profile(args):
+    setup_django(args.profile, args.database)
+    from django.core.management import call_command
+    from django.db import OperationalError, connections
+
+    from posts import feeds
+    from posts.models import Comment, Post, User
+
+    call_command("migrate", verbosity=0)
+    author = User.objects.create_user(username="load-author")
+    post_ids = [
+        Post.objects.create(text="Пост {}".format(number), author=author).id
+        for number in range(args.posts)
+    ]
+    connections.close_all()
+
+    stop = threading.Event()
+    reads = [0] * args.readers
+    writes = [0]
+    errors = [0]
+
+    def reader(number):
+        while not stop.is_set():
+            try:
+                list(feeds.index_feed()[:10])
+                post = feeds.post_detail().get(id=random.choice(post_ids))
+                list(feeds.post_comments(post)[:50])
+                reads[number] += 1
+            except OperationalError:
+                errors[0] += 1
+        connections.close_all()
+
+    def writer():
+        while not stop.is_set():
+            try:
+                Comment.objects.create(post_id=random.choice(post_ids),
+                                       author=author, text="Комментарий")
+                writes[0] += 1
+            except OperationalError:
+                errors[0] += 1
+        connections.close_all()
+
+    threads = [threading.Thread(target=reader, args=(number,))
+               for number in range(args.readers)]
+    threads += [threading.Thread(target=writer)
+                for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    print(json.dumps({
+        "profile": args.profile,
+        "reads_per_second": round(sum(reads) / args.seconds, 1),
+        "writes_per_second": round(writes[0] / args.seconds, 1),
+        "errors": errors[0],
+    }))
+
+
+def compare(args):
+    results = []
+    for profile in PROFILES:
+        with tempfile.TemporaryDirectory() as directory:
+            command = [
+                sys.executable, os.path.abspath(__file__),
+                "--profile", profile,
+                "--database", os.path.join(directory, "load.sqlite3"),
+                "--seconds", str(args.seconds),
+                "--readers", str(args.readers),
+                "--writers", str(args.writers),
+                "--posts", str(args.posts),
+            ]
+            output = subprocess.run(command, check=True, cwd=BASE_DIR,
+                                    stdout=subprocess.PIPE).stdout
+            results.append(json.loads(output.decode().splitlines()[-1]))
+    print("{:<8} {:>10} {:>10} {:>8}".format(
+        "profile", "reads/s", "writes/s", "errors"))
+    for result in results:
+        print("{profile:<8} {reads_per_second:>10} {writes_per_second:>10} "
+              "{errors:>8}".format(**result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=PROFILES)
+    parser.add_argument("--database")
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--posts", type=int, default=200)
+    args = parser.parse_args()
+    if args.profile:
+        run_profile(args)
+    else:
+        compare(args)
+
+
+if __name__ == "__main__":
+    main()
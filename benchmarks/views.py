@@ -0,0 +1,239 @@
+"""Замеры всех представлений posts/urls.py на синтетических данных.
+
+Для каждого масштаба создаётся временная SQLite-база, заполняется
+командой ``generate_data`` и каждое представление запрашивается через
+``django.test.Client`` с холодным и прогретым кэшем. Результаты
+сохраняются в JSON, два таких файла можно сравнить.
+
+    python benchmarks/views.py --scales small medium --output new.json
+    python benchmarks/views.py --compare old.json new.json
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCALES = {
+    "small": {"users": 200, "posts": 2000, "comments": 4000, "groups": 10},
+    "medium": {"users": 1000, "posts": 20000, "comments": 40000,
+               "groups": 30},
+    "large": {"users": 5000, "posts": 200000, "comments": 400000,
+              "groups": 100},
+}
+# GET на эти маршруты меняет данные: замеры шли бы по другой базе.
+STATE_CHANGING = {"profile_follow", "profile_unfollow"}
+
+
+def setup_django(database):
+    os.environ["YATUBE_DB_PROFILE"] = "sqlite"
+    os.environ["YATUBE_DB_NAME"] = database
+    # Картинки generate_data кладутся рядом с временной базой.
+    os.environ["YATUBE_MEDIA_ROOT"] = os.path.join(
+        os.path.dirname(database), "media")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
+    sys.path.insert(0, BASE_DIR)
+    import django
+    django.setup()
+
+
+def view_urls():
+    """``[(имя, url, клиент)]`` для маршрутов posts/urls.py.
+
+    Маршруты из ``STATE_CHANGING`` пропускаются.
+    """
+    from django.urls import reverse
+
+    from posts.models import Group, Post, User
+    from posts.urls import urlpatterns
+
+    reader = User.objects.order_by("-stats__following_count").first()
+    author = User.objects.order_by("-stats__followers_count").first()
+    post = author.posts.order_by("-comments_count").first() or \
+        Post.objects.order_by("-comments_count").first()
+    group = Group.objects.order_by("-id").first()
+    arguments = {
+        "group": [group.slug],
+        "profile": [author.username],
+        "post": [post.author.username, post.id],
+        "post_edit": [post.author.username, post.id],
+        "add_comment": [post.author.username, post.id],
+        "post_comments": [post.author.username, post.id],
+    }
+    queries = {"search": "?q=кошка+кофе"}
+    urls = []
+    for pattern in urlpatterns:
+        name = pattern.name
+        if name in STATE_CHANGING:
+            continue
+        url = reverse(name, args=arguments.get(name, []))
+        user = post.author if name == "post_edit" else reader
+        urls.append((name, url + queries.get(name, ""), user))
+    return urls
+
+
+def measure(client, url, repeat, cold):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    queries = []
+    status = None
+    client.get(url)
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(context.captured_queries))
+        status = response.status_code
+    timings.sort()
+    return {
+        "status": status,
+        "median_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[int(0.95 * (len(timings) - 1))], 2),
+        "min_ms": round(timings[0], 2),
+        "queries": max(queries),
+    }
+
+
+def run_scale(args):
+    setup_django(args.database)
+    from django.core.management import call_command
+    from django.test import Client
+
+    call_command("migrate", verbosity=0)
+    params = SCALES[args.scale]
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        call_command("generate_data", stdout=devnull, seed=args.seed,
+                     **params)
+    seeded = time.perf_counter() - started
+
+    views = {}
+    clients = {}
+    for name, url, user in view_urls():
+        if user.id not in clients:
+            clients[user.id] = Client()
+            clients[user.id].force_login(user)
+        client = clients[user.id]
+        views[name] = {
+            "url": url,
+            "cold": measure(client, url, args.repeat, cold=True),
+            "warm": measure(client, url, args.repeat, cold=False),
+        }
+    print(json.dumps({"params": params, "seed_seconds": round(seeded, 1),
+                      "views": views}))
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True,
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    results = {
+        "created": dt.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    for scale in args.scales:
+        with tempfile.TemporaryDirectory() as directory:
+            command = [
+                sys.executable, os.path.abspath(__file__),
+                "--scale", scale,
+                "--database", os.path.join(directory, "views.sqlite3"),
+                "--repeat", str(args.repeat),
+                "--seed", str(args.seed),
+            ]
+            output = subprocess.run(command, check=True, cwd=BASE_DIR,
+                                    stdout=subprocess.PIPE).stdout
+            results["scales"][scale] = json.loads(
+                output.decode().splitlines()[-1])
+        print_scale(scale, results["scales"][scale])
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2, ensure_ascii=False)
+        print("\nСохранено в {}".format(args.output))
+
+
+def print_scale(scale, result):
+    print("\n{} {} (заполнение {} с)".format(
+        scale, result["params"], result["seed_seconds"]))
+    print("{:<18} {:>6} {:>10} {:>10} {:>10} {:>8}".format(
+        "view", "status", "cold ms", "warm ms", "warm p95", "queries"))
+    for name, view in result["views"].items():
+        print("{:<18} {:>6} {:>10} {:>10} {:>10} {:>8}".format(
+            name, view["warm"]["status"], view["cold"]["median_ms"],
+            view["warm"]["median_ms"], view["warm"]["p95_ms"],
+            view["cold"]["queries"]))
+
+
+def compare(args):
+    """Сравнивает медианы двух прогонов; код выхода 1 при регрессии."""
+    with open(args.compare[0]) as old, open(args.compare[1]) as new:
+        before, after = json.load(old), json.load(new)
+    print("{} -> {}".format(before.get("revision"), after.get("revision")))
+    print("{:<8} {:<18} {:<5} {:>10} {:>10} {:>8} {:>9}".format(
+        "scale", "view", "cache", "before", "after", "change", "queries"))
+    regressions = 0
+    for scale, result in after["scales"].items():
+        baseline = before["scales"].get(scale)
+        if baseline is None:
+            continue
+        for name, view in result["views"].items():
+            if name not in baseline["views"]:
+                continue
+            for mode in ("cold", "warm"):
+                old = baseline["views"][name][mode]
+                new = view[mode]
+                change = (new["median_ms"] - old["median_ms"]) / max(
+                    old["median_ms"], 0.01)
+                worse = change > args.threshold or \
+                    new["queries"] > old["queries"]
+                regressions += worse
+                print("{:<8} {:<18} {:<5} {:>10} {:>10} {:>+7.0%} {:>4}->{:<4}"
+                      "{}".format(scale, name, mode, old["median_ms"],
+                                  new["median_ms"], change, old["queries"],
+                                  new["queries"], " !" if worse else ""))
+    sys.exit(1 if regressions else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", choices=SCALES,
+                        default=["small", "medium"])
+    parser.add_argument("--scale", choices=SCALES)
+    parser.add_argument("--database")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Сохранить результаты в JSON.")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="Сравнить два сохранённых прогона.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Допустимый рост медианы, доля.")
+    args = parser.parse_args()
+    if args.compare:
+        compare(args)
+    elif args.scale:
+        run_scale(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,108 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.exceptions import FieldError, PermissionDenied
+from django.http import Http404, HttpResponseBadRequest
+from django.urls import path, reverse
 
-from .models import Comment, Follow, Group, Post
+from . import exports, search
+from .models import Comment, Follow, Group, Job, Post
+from .paginators import EstimatedCountPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class ExportMixin:
+    """Потоковая выгрузка строк списка в CSV и JSONL.
+
+    Действия выгружают отмеченные строки, а адрес ``export/<формат>/``
+    у списка модели — все строки с текущими фильтрами и поиском.
+    Ссылки на него выводятся над списком.
+    """
+    export_columns = ()
+    actions = ("export_csv", "export_jsonl")
+    change_list_template = "admin/posts/export_change_list.html"
+
+    def export_url_name(self):
+        return "{}_{}_export".format(self.model._meta.app_label,
+                                     self.model._meta.model_name)
+
+    def get_urls(self):
+        return [
+            path("export/<str:fmt>/",
+                 self.admin_site.admin_view(self.export_view),
+                 name=self.export_url_name()),
+        ] + super().get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        query = request.GET.urlencode()
+        extra_context = dict(extra_context or {})
+        extra_context["export_links"] = [
+            (fmt.upper(),
+             reverse("admin:" + self.export_url_name(), args=[fmt],
+                     current_app=self.admin_site.name)
+             + ("?" + query if query else ""))
+            for fmt in exports.FORMATS
+        ]
+        return super().changelist_view(request, extra_context)
+
+    def export(self, queryset, fmt):
+        return exports.stream(queryset, self.export_columns, fmt,
+                              self.model._meta.model_name)
+
+    def export_view(self, request, fmt):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        if fmt not in exports.FORMATS:
+            raise Http404
+        try:
+            changelist = self.get_changelist_instance(request)
+            queryset = changelist.get_queryset(request)
+        except (IncorrectLookupParameters, FieldError):
+            return HttpResponseBadRequest("Неверные параметры фильтра")
+        return self.export(queryset, fmt)
+
+    def export_csv(self, request, queryset):
+        return self.export(queryset, "csv")
+    export_csv.short_description = "Выгрузить в CSV"
+
+    def export_jsonl(self, request, queryset):
+        return self.export(queryset, "jsonl")
+    export_jsonl.short_description = "Выгрузить в JSONL"
+
+
+class LargeTableMixin:
+    """Списки больших таблиц: без полного COUNT(*) и без N+1."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        # Номер страницы нужен, чтобы COUNT досчитывал до строк за ней.
+        try:
+            page = max(int(request.GET.get(PAGE_VAR, 0)), 0) + 1
+        except ValueError:
+            page = 1
+        return self.paginator(queryset, per_page, orphans,
+                              allow_empty_first_page, page=page)
+
+
+class PostAdmin(LargeTableMixin, ExportMixin, admin.ModelAdmin):
     list_display = ("pk", "text", "pub_date", "author",
                     "group", "image")
+    list_select_related = ("author", "group")
+    autocomplete_fields = ("author", "group")
     search_fields = ("text",)
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
+    export_columns = ("id", "pub_date", "author__username", "group__slug",
+                      "text", "image", "comments_count")
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по инвертированному индексу вместо LIKE по всей таблице.
+        found = search.posts_with_terms(queryset, search_term)
+        if found is None:
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        return found, False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -18,13 +112,29 @@ class GroupAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("title",)}
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableMixin, ExportMixin, admin.ModelAdmin):
     list_display = ("pk", "text", "post")
+    list_select_related = ("post",)
+    autocomplete_fields = ("post", "author")
+    ordering = ("-pk",)
     empty_value_display = "-пусто-"
+    export_columns = ("id", "created", "post_id", "author__username",
+                      "text")
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableMixin, ExportMixin, admin.ModelAdmin):
     list_display = ("user", "author")
+    list_select_related = ("user", "author")
+    autocomplete_fields = ("user", "author")
+    empty_value_display = "-пусто-"
+    export_columns = ("id", "user__username", "author__username")
+
+
+class JobAdmin(LargeTableMixin, admin.ModelAdmin):
+    list_display = ("pk", "name", "status", "attempts", "run_at",
+                    "finished")
+    list_filter = ("status", "name")
+    search_fields = ("key",)
     empty_value_display = "-пусто-"
 
 
@@ -32,3 +142,4 @@ admin.site.register(Group, GroupAdmin)
 admin.site.register(Post, PostAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from .. import cache, feeds
+from ..conditional import conditional
+from ..models import Group, Post, User
+from ..paginators import KeysetPaginator
+
+POST_FIELDS = {
+    "id": lambda post: post.id,
+    "text": lambda post: post.text,
+    "pub_date": lambda post: post.pub_date.isoformat(),
+    "author": lambda post: post.author.username,
+    "group": lambda post: post.group.slug if post.group_id else None,
+    "image": lambda post: post.thumbnail_url or None,
+    "comments_count": lambda post: post.comments_count,
+}
+COMMENT_FIELDS = {
+    "id": lambda comment: comment.id,
+    "text": lambda comment: comment.text,
+    "created": lambda comment: comment.created.isoformat(),
+    "author": lambda comment: comment.author.username,
+}
+
+
+def api_response(data, status=200):
+    # Компактный JSON: без пробелов и без \u-экранирования кириллицы.
+    return JsonResponse(data, status=status, json_dumps_params={
+        "separators": (",", ":"),
+        "ensure_ascii": False,
+    })
+
+
+def requested_fields(request, available):
+    """Поля из ``?fields=id,text`` или все доступные."""
+    value = request.GET.get("fields")
+    if not value:
+        return list(available)
+    fields = [field for field in value.split(",") if field]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError("Неизвестные поля: {}".format(", ".join(unknown)))
+    return fields
+
+
+def page_limit(request):
+    value = request.GET.get("limit")
+    if not value:
+        return settings.PER_PAGE
+    if not value.isdigit() or int(value) < 1:
+        raise ValueError("limit должен быть положительным числом")
+    return min(int(value), settings.API_MAX_LIMIT)
+
+
+def serialize(obj, fields, serializers):
+    return {field: serializers[field](obj) for field in fields}
+
+
+def feed_response(request, queryset, scopes):
+    try:
+        fields = requested_fields(request, POST_FIELDS)
+        limit = page_limit(request)
+    except ValueError as error:
+        return api_response({"error": str(error)}, status=400)
+
+    def respond():
+        page = KeysetPaginator(queryset, limit).get_page(
+            after=request.GET.get("after"),
+            before=request.GET.get("before"),
+        )
+        return api_response({
+            "results": [serialize(post, fields, POST_FIELDS)
+                        for post in page],
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+        })
+
+    return conditional(request, scopes, respond,
+                       variant=request.get_full_path())
+
+
+@require_safe
+def index(request):
+    return feed_response(request, feeds.index_feed(), [cache.GLOBAL_SCOPE])
+
+
+@require_safe
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, feeds.group_feed(group),
+                         [cache.group_scope(group.id)])
+
+
+@require_safe
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, feeds.profile_feed(author),
+                         [cache.author_scope(author.id)])
+
+
+@require_safe
+def post_detail(request, post_id):
+    try:
+        fields = requested_fields(request, [*POST_FIELDS, "comments"])
+    except ValueError as error:
+        return api_response({"error": str(error)}, status=400)
+
+    def respond():
+        post = get_object_or_404(feeds.feed(), id=post_id)
+        data = serialize(post, [field for field in fields
+                                if field != "comments"], POST_FIELDS)
+        if "comments" in fields:
+            page = comments_page(post, settings.COMMENTS_PER_PAGE)
+            data["comments"] = [
+                serialize(comment, COMMENT_FIELDS, COMMENT_FIELDS)
+                for comment in page
+            ]
+            data["comments_next"] = page.next_cursor
+        return api_response(data)
+
+    return conditional(request, [cache.post_scope(post_id)], respond,
+                       variant=request.get_full_path())
+
+
+def comments_page(post, limit, after=None):
+    paginator = KeysetPaginator(feeds.post_comments(post), limit,
+                                fields=feeds.COMMENT_CURSOR)
+    return paginator.get_page(after=after)
+
+
+@require_safe
+def post_comments(request, post_id):
+    try:
+        limit = page_limit(request)
+    except ValueError as error:
+        return api_response({"error": str(error)}, status=400)
+
+    def respond():
+        post = get_object_or_404(Post.objects.only("id"), id=post_id)
+        page = comments_page(post, limit, request.GET.get("after"))
+        return api_response({
+            "results": [serialize(comment, COMMENT_FIELDS, COMMENT_FIELDS)
+                        for comment in page],
+            "next": page.next_cursor,
+        })
+
+    return conditional(request, [cache.post_scope(post_id)], respond,
+                       variant=request.get_full_path())
@@ -0,0 +1,176 @@
+import hashlib
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_PREFIX = "feed-version:"
+FRAGMENT_KEY = "feed-page:{}:{}:{}"
+LOCK_PREFIX = "cache-lock:"
+GLOBAL_SCOPE = "global"
+# Каталог групп: названия и описания; счётчики меняются вместе с GLOBAL.
+GROUPS_SCOPE = "groups"
+# Популярное: сбрасывается при затухании счетов.
+TRENDING_SCOPE = "trending"
+
+
+def group_scope(group_id):
+    return "group:{}".format(group_id)
+
+
+def author_scope(author_id):
+    return "author:{}".format(author_id)
+
+
+def user_scope(user_id):
+    """Имя пользователя в карточках его постов."""
+    return "user:{}".format(user_id)
+
+
+def group_info_scope(group_id):
+    """Название и адрес группы в карточках её постов."""
+    return "group-info:{}".format(group_id)
+
+
+def post_scope(post_id):
+    return "post:{}".format(post_id)
+
+
+def follow_scope(user_id):
+    return "follow:{}".format(user_id)
+
+
+def profile_scope(user_id):
+    """Карточка профиля: счётчики записей и подписок."""
+    return "profile:{}".format(user_id)
+
+
+def recommendation_scope(user_id):
+    """Рекомендации авторов для пользователя."""
+    return "recommendations:{}".format(user_id)
+
+
+def _version_key(scope):
+    return VERSION_PREFIX + scope
+
+
+def _new_version():
+    # Случайная метка вместо счётчика: если ключ версии вытеснят
+    # из кэша, новая версия не совпадёт ни с одной из старых.
+    return uuid.uuid4().hex[:12]
+
+
+def _versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            version = _new_version()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+            found[key] = version
+    return [found[key] for key in keys]
+
+
+def versions(*scopes):
+    """Текущие версии лент одной строкой для ключа ``{% cache %}``."""
+    return ".".join(_versions(scopes))
+
+
+def scope_versions(scopes):
+    """Версии нескольких лент одним чтением: ``{лента: версия}``."""
+    scopes = list(set(scopes))
+    return dict(zip(scopes, _versions(scopes)))
+
+
+def bump(*scopes):
+    """Сбрасывает закэшированные фрагменты перечисленных лент.
+
+    Внутри транзакции версии меняются ещё раз после её фиксации:
+    параллельный запрос мог прочитать новую версию раньше, чем стала
+    видна сама запись, и закэшировать под ней старые данные.
+    """
+    if scopes:
+        _bump(scopes)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    cache.set_many(
+        {_version_key(scope): _new_version() for scope in set(scopes)},
+        None
+    )
+
+
+def _fragment_keys(name, version, vary):
+    digest = hashlib.md5(
+        ":".join(str(value) for value in vary).encode()).hexdigest()
+    return (FRAGMENT_KEY.format(name, digest, version),
+            FRAGMENT_KEY.format(name, digest, "latest"))
+
+
+def _expired(entry):
+    # Вероятностный досрочный пересчёт (XFetch): чем ближе срок и чем
+    # дольше считается фрагмент, тем вероятнее запрос пересчитает его
+    # заранее, пока остальные ещё читают старую запись.
+    early = entry["delta"] * settings.FEED_CACHE_BETA * math.log(
+        1 - random.random())
+    return time.time() - early >= entry["expires"]
+
+
+def fragment(name, version, vary, compute, timeout, on_stale=None):
+    """HTML фрагмента ленты из кэша; ``compute()`` вызывает один запрос.
+
+    Пока один запрос пересчитывает фрагмент, остальные получают
+    текущую запись, запись прошлой версии ленты или ждут результат
+    не дольше ``FEED_CACHE_LOCK_TIMEOUT``. Если отдана прошлая версия,
+    вызывается ``on_stale()``.
+    """
+    fresh_key, stale_key = _fragment_keys(name, version, vary)
+    entry = cache.get(fresh_key)
+    if entry is not None and not _expired(entry):
+        return entry["html"]
+    lock = LOCK_PREFIX + fresh_key
+    lock_timeout = settings.FEED_CACHE_LOCK_TIMEOUT
+    token = uuid.uuid4().hex
+    if not cache.add(lock, token, lock_timeout):
+        entry = entry or cache.get(stale_key) or _wait_for(fresh_key,
+                                                           lock_timeout)
+        if entry is not None:
+            if entry.get("version") != version and on_stale is not None:
+                on_stale()
+            return entry["html"]
+        return compute()
+    try:
+        started = time.time()
+        html = compute()
+        finished = time.time()
+        entry = {
+            "html": html,
+            "version": version,
+            "delta": finished - started,
+            "expires": finished + timeout if timeout else math.inf,
+        }
+        cache.set(fresh_key, entry, timeout)
+        cache.set(stale_key, entry, timeout * 2 if timeout else None)
+        return html
+    finally:
+        # Если пересчёт шёл дольше таймаута, блокировку уже мог взять
+        # другой запрос: удаляем только свою.
+        if cache.get(lock) == token:
+            cache.delete(lock)
+
+
+def _wait_for(key, timeout, poll=0.05):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(poll)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
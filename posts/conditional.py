@@ -0,0 +1,79 @@
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import (add_never_cache_headers,
+                                get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import quote_etag
+
+from . import cache
+
+
+def mark_stale(request):
+    """Отмечает, что в ответ попал фрагмент прошлой версии ленты."""
+    request.stale_fragment = True
+
+
+def is_stale(request):
+    return getattr(request, "stale_fragment", False)
+
+
+def conditional(request, scopes, respond, variant=""):
+    """Отвечает 304, если ленты ``scopes`` не менялись у клиента.
+
+    ETag берётся из версий лент, которые сбрасываются при каждой
+    записи, так что проверка не обращается к базе. Last-Modified не
+    отправляется: в нём только секунды, и после двух записей за одну
+    секунду клиент с If-Modified-Since получал бы 304 на старую
+    страницу.
+    ``respond`` вызывается, только если ответ нужно собирать заново;
+    ``variant`` отличает разные представления одних и тех же лент.
+    Ответ, собранный из прошлой версии фрагмента, уходит без
+    валидаторов: иначе клиент получал бы 304 на устаревшую страницу.
+    """
+    etag = quote_etag(hashlib.md5(
+        "{}|{}".format(cache.versions(*scopes), variant).encode()
+    ).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = respond()
+        if is_stale(request):
+            return response
+    if response.status_code in (200, 304):
+        response["ETag"] = etag
+    return response
+
+
+def conditional_page(request, scopes, respond):
+    """``conditional`` для HTML-страниц с заголовками для кэшей.
+
+    Гостевые страницы одинаковы для всех, и прокси может отдавать их
+    сам, обновляя в фоне. Страницы пользователя приватные и каждый раз
+    проверяются по ETag, в который входят id пользователя, его сессия
+    и CSRF-токен.
+    """
+    user = request.user
+    variant = [str(user.pk or ""), request.get_full_path()]
+    if user.is_authenticated:
+        # В странице зашит CSRF-токен формы: после нового входа старая
+        # копия из кэша браузера отправила бы устаревший токен.
+        variant += [request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+                    request.session.session_key or ""]
+    response = conditional(request, scopes, respond,
+                           variant="|".join(variant))
+    if response.status_code not in (200, 304):
+        return response
+    if is_stale(request):
+        # Устаревшую страницу нельзя сохранять ни прокси, ни браузеру.
+        add_never_cache_headers(response)
+    elif user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.PAGE_CACHE_MAX_AGE,
+            stale_while_revalidate=settings.PAGE_STALE_WHILE_REVALIDATE,
+        )
+    patch_vary_headers(response, ("Cookie",))
+    return response
@@ -0,0 +1,135 @@
+import json
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import (Comment, Follow, Group, GroupAuthor, GroupStats, Post,
+                     User, UserStats)
+
+# Сколько самых активных авторов показывать в каталоге групп.
+TOP_AUTHORS = 3
+
+
+def _rows(model, lookup, field, delta):
+    # Счётчики неотрицательные: если они разошлись с данными, уменьшение
+    # пропускается, а не падает на ограничении базы. Точные значения
+    # вернёт команда recount.
+    rows = model.objects.filter(**lookup)
+    if delta < 0:
+        rows = rows.filter(**{field + "__gte": -delta})
+    return rows
+
+
+def bump_row(model, lookup, field, delta):
+    """Прибавляет ``delta`` к полю строки, создавая её при необходимости."""
+    updated = _rows(model, lookup, field, delta).update(
+        **{field: F(field) + delta})
+    if updated or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **{field: delta})
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    bump_row(UserStats, {"user_id": user_id}, field, delta)
+
+
+def bump_group(group_id, author_id, delta, pub_date):
+    """Учитывает в сводке группы добавленную (+1) или удалённую (-1) запись."""
+    author = {"group_id": group_id, "author_id": author_id}
+    bump_row(GroupAuthor, author, "posts_count", delta)
+    bump_row(GroupStats, {"group_id": group_id}, "posts_count", delta)
+    stats = GroupStats.objects.filter(group_id=group_id)
+    if delta > 0:
+        stats.filter(
+            Q(last_post_at__isnull=True) | Q(last_post_at__lt=pub_date)
+        ).update(last_post_at=pub_date)
+    else:
+        GroupAuthor.objects.filter(**author, posts_count=0).delete()
+        # Дата берётся заново, только если удалили самую свежую запись.
+        stats.filter(last_post_at__lte=pub_date).update(
+            last_post_at=_last_post(group_id))
+    refresh_top_authors(group_id)
+
+
+def _last_post(group_id):
+    return Subquery(Post.objects.filter(group_id=group_id)
+                    .order_by("-pub_date").values("pub_date")[:1])
+
+
+def refresh_top_authors(group_id):
+    top = (GroupAuthor.objects
+           .filter(group_id=group_id, posts_count__gt=0)
+           .order_by("-posts_count", "author_id")
+           .values_list("author__username", "posts_count")[:TOP_AUTHORS])
+    GroupStats.objects.filter(group_id=group_id).update(
+        top_authors=json.dumps(list(top), ensure_ascii=False))
+
+
+def bump_post(post_id, delta):
+    _rows(Post, {"id": post_id}, "comments_count", delta).update(
+        comments_count=F("comments_count") + delta)
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(model.objects.filter(**{field: OuterRef("pk")})
+                 .order_by()
+                 .values(field)
+                 .annotate(total=Count("pk"))
+                 .values("total")),
+        0
+    )
+
+
+def recount_posts(start, stop):
+    return Post.objects.filter(pk__gte=start, pk__lt=stop).update(
+        comments_count=_count(Comment, "post"))
+
+
+def recount_users(start, stop):
+    users = User.objects.filter(pk__gte=start, pk__lt=stop)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in users.values_list("pk", flat=True)],
+        ignore_conflicts=True,
+    )
+    return UserStats.objects.filter(
+        user_id__gte=start, user_id__lt=stop
+    ).update(
+        posts_count=_count(Post, "author"),
+        followers_count=_count(Follow, "author"),
+        following_count=_count(Follow, "user"),
+    )
+
+
+def recount_groups(start, stop):
+    groups = Group.objects.filter(pk__gte=start, pk__lt=stop)
+    group_ids = list(groups.values_list("pk", flat=True))
+    in_range = {"group_id__gte": start, "group_id__lt": stop}
+    GroupStats.objects.bulk_create(
+        [GroupStats(group_id=pk) for pk in group_ids],
+        ignore_conflicts=True,
+    )
+    GroupAuthor.objects.filter(**in_range).delete()
+    GroupAuthor.objects.bulk_create([
+        GroupAuthor(**row)
+        for row in Post.objects.filter(**in_range)
+        .order_by()
+        .values("group_id", "author_id")
+        .annotate(posts_count=Count("pk"))
+    ])
+    updated = GroupStats.objects.filter(**in_range).update(
+        posts_count=_count(Post, "group"),
+        last_post_at=Subquery(Post.objects.filter(group=OuterRef("pk"))
+                              .order_by()
+                              .values("group")
+                              .annotate(last=Max("pub_date"))
+                              .values("last")),
+    )
+    for group_id in group_ids:
+        refresh_top_authors(group_id)
+    return updated
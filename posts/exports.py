@@ -0,0 +1,61 @@
+import csv
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+# Сколько строк склеивается в один кусок ответа.
+LINES_PER_CHUNK = 500
+
+
+class Echo:
+    """Псевдофайл для csv.writer: ``write`` просто возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder,
+                         ensure_ascii=False) + "\n"
+
+
+def chunks(lines):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == LINES_PER_CHUNK:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def stream(queryset, columns, fmt, filename):
+    """Отдаёт строки ``queryset`` файлом, не загружая их в память.
+
+    Выбираются только ``columns``, курсор читается пачками, и первые
+    байты уходят клиенту до того, как выборка дочитана.
+    """
+    rows = queryset.values_list(*columns).iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE)
+    lines = csv_lines(columns, rows) if fmt == "csv" else \
+        jsonl_lines(columns, rows)
+    response = StreamingHttpResponse(chunks(lines),
+                                     content_type=FORMATS[fmt])
+    response["Content-Disposition"] = 'attachment; filename="{}.{}"'.format(
+        filename, fmt)
+    return response
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db.models import F
+
+from .models import Post
+from .timeline import timeline_posts
+
+# Поля, которые нужны шаблону posts/includes/post_item.html.
+FEED_FIELDS = (
+    "id",
+    "text",
+    "pub_date",
+    "image",
+    "comments_count",
+    "updated",
+    "thumbnails",
+    "author__id",
+    "author__username",
+    "group__id",
+    "group__slug",
+    "group__title",
+)
+COMMENT_CURSOR = ("created", "id")
+# Второе поле курсора — id из таблицы счетов, а не из постов: тогда
+# база идёт по индексу post_trend_score без досортировки.
+TRENDING_CURSOR = ("score", "trend_id")
+COMMENT_FIELDS = (
+    "id",
+    "text",
+    "created",
+    "post_id",
+    "author__id",
+    "author__username",
+)
+
+
+def feed(queryset=None):
+    """Общая выборка для всех лент: нужные join'ы и только нужные поля.
+
+    Число комментариев хранится в ``Post.comments_count``, поэтому
+    аннотация с COUNT не требуется.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.select_related("author", "group").only(*FEED_FIELDS)
+
+
+def index_feed():
+    return feed()
+
+
+def group_feed(group):
+    return feed(group.posts.all())
+
+
+def profile_feed(author):
+    return feed(author.posts.all())
+
+
+def trending_feed():
+    """Посты со счётом популярности, курсор — ``TRENDING_CURSOR``."""
+    return feed(Post.objects.filter(trend__isnull=False)).annotate(
+        score=F("trend__score"), trend_id=F("trend__post"))
+
+
+def follow_feed(user, pulled=None):
+    return feed(timeline_posts(user, pulled))
+
+
+def post_detail():
+    return Post.objects.select_related("author__stats", "group")
+
+
+def post_comments(post):
+    return (post.comments.select_related("author")
+            .only(*COMMENT_FIELDS))
+
+
+def first_comments(post):
+    """Первая страница комментариев: новые сверху."""
+    return post_comments(post).order_by(
+        "-created", "-id")[:settings.COMMENTS_PER_PAGE]
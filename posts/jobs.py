@@ -0,0 +1,159 @@
+import datetime as dt
+import json
+import logging
+import time
+import traceback
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name):
+    """Регистрирует функцию как задачу очереди под именем ``name``."""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, key=None, delay=0, **payload):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Задачи с одинаковым ``key`` выполняются один раз: повторная
+    постановка молча игнорируется. При ``JOBS_INLINE`` задача
+    выполняется сразу.
+    """
+    if name not in TASKS:
+        raise ValueError("Неизвестная задача: {}".format(name))
+    if settings.JOBS_INLINE:
+        TASKS[name](**payload)
+        return None
+    run_at = timezone.now() + dt.timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                key=key,
+                payload=json.dumps(payload),
+                run_at=run_at,
+                max_attempts=settings.JOB_MAX_ATTEMPTS,
+            )
+    except IntegrityError:
+        # Задача с этим ключом уже выполнена или ждёт очереди; упавшую
+        # ставим заново, иначе ключ был бы занят навсегда.
+        Job.objects.filter(key=key, status=Job.FAILED).update(
+            name=name,
+            payload=json.dumps(payload),
+            status=Job.QUEUED,
+            attempts=0,
+            run_at=run_at,
+            locked_at=None,
+            finished=None,
+        )
+        return None
+
+
+def enqueue_coalesced(name, key, interval, **payload):
+    """Ставит задачу в конце текущего интервала ``interval`` секунд.
+
+    Все постановки с одним ``key`` за интервал сливаются в одну задачу,
+    которая выполнится после них.
+    """
+    now = time.time()
+    slot = int(now // interval)
+    return enqueue(name, key="{}:{}".format(key, slot),
+                   delay=(slot + 1) * interval - now, **payload)
+
+
+def claim(limit):
+    """Забирает до ``limit`` готовых задач и возвращает их id.
+
+    Задача достаётся тому воркеру, чей условный UPDATE сработал
+    первым, поэтому блокировки строк не нужны и на SQLite.
+    """
+    now = timezone.now()
+    candidates = (Job.objects
+                  .filter(status=Job.QUEUED, run_at__lte=now)
+                  .order_by("run_at", "id")
+                  .values_list("id", flat=True)[:limit])
+    return [
+        job_id for job_id in list(candidates)
+        if Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+    ]
+
+
+def run(job_id):
+    """Выполняет взятую задачу; при ошибке откладывает повтор."""
+    job = Job.objects.get(id=job_id)
+    try:
+        with transaction.atomic():
+            # Транзакция начинается с записи. SQLite иначе открывает её
+            # на чтение, и две задачи, которые сначала читают, а потом
+            # пишут, упираются друг в друга с «database is locked».
+            Job.objects.filter(id=job.id).update(locked_at=timezone.now())
+            TASKS[job.name](**json.loads(job.payload))
+    except Exception:
+        logger.exception("Задача %s завершилась ошибкой", job)
+        retry = job.attempts < job.max_attempts
+        delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+        Job.objects.filter(id=job.id).update(
+            status=Job.QUEUED if retry else Job.FAILED,
+            run_at=timezone.now() + dt.timedelta(seconds=delay),
+            locked_at=None,
+            finished=None if retry else timezone.now(),
+            last_error=traceback.format_exc(),
+        )
+        return False
+    Job.objects.filter(id=job.id).update(
+        status=Job.DONE,
+        locked_at=None,
+        finished=timezone.now(),
+    )
+    return True
+
+
+def run_in_thread(job_id):
+    close_old_connections()
+    try:
+        return run(job_id)
+    finally:
+        close_old_connections()
+
+
+def heartbeat(job_ids):
+    """Продлевает блокировку задач, которые воркер ещё выполняет."""
+    return Job.objects.filter(id__in=job_ids, status=Job.RUNNING).update(
+        locked_at=timezone.now())
+
+
+def release_stale():
+    """Возвращает в очередь задачи воркеров, которые упали на середине.
+
+    Живой воркер продлевает блокировку через ``heartbeat`` чаще, чем
+    раз в ``JOB_LOCK_TIMEOUT``, поэтому его задачи здесь не трогаются.
+    """
+    deadline = timezone.now() - dt.timedelta(
+        seconds=settings.JOB_LOCK_TIMEOUT)
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=deadline
+    ).update(status=Job.QUEUED, locked_at=None)
+
+
+def purge():
+    """Удаляет давно завершённые задачи, в том числе упавшие."""
+    deadline = timezone.now() - dt.timedelta(seconds=settings.JOB_RETENTION)
+    deleted, _ = Job.objects.filter(status__in=(Job.DONE, Job.FAILED),
+                                    finished__lt=deadline).delete()
+    return deleted
@@ -0,0 +1,44 @@
+import gzip
+import sys
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+def open_output(path):
+    if path == "-":
+        return sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+class Command(BaseCommand):
+    help = ("Выгружает пользователей, группы, посты, комментарии и подписки "
+            "в JSON Lines (.gz — со сжатием).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-",
+                            help="Файл для выгрузки, «-» — stdout.")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        counts = Counter()
+        started = time.monotonic()
+        output = open_output(options["path"])
+        try:
+            for line in transfer.export_lines(options["chunk_size"], counts):
+                output.write(line + "\n")
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        elapsed = max(time.monotonic() - started, 1e-6)
+        total = sum(counts.values())
+        # Отчёт в stderr: stdout может быть самой выгрузкой.
+        for name, model, fields in transfer.MODELS:
+            self.stderr.write("{}: {}".format(name, counts[name]))
+        self.stderr.write("Выгружено строк: {} ({:.0f} строк/с)".format(
+            total, total / elapsed))
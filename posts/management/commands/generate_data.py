@@ -0,0 +1,227 @@
+import datetime as dt
+import io
+import itertools
+import random
+import time
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from posts.models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    "кошка собака город море лес река утро вечер дорога книга музыка кино "
+    "работа отпуск погода друзья семья кофе поезд горы солнце дождь снег "
+    "фото проект код релиз python django база запрос кэш лента подписка "
+    "новости история праздник спорт футбол бег велосипед рецепт ужин"
+).split()
+IMAGE_COLORS = ("#d35400", "#2980b9", "#27ae60", "#8e44ad",
+                "#c0392b", "#16a085", "#f39c12", "#2c3e50")
+IMAGE_SIZE = (960, 540)
+
+
+def power_law(count, alpha, rng=None):
+    """Кумулятивные веса Ципфа для ``count`` объектов.
+
+    Без ``rng`` веса убывают по порядку объектов, с ним перемешаны.
+    """
+    weights = [1 / (rank + 1) ** alpha for rank in range(count)]
+    if rng is not None:
+        rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+def adapt_row(row):
+    # Даты записываются в том же виде, что и через ORM, иначе на SQLite
+    # сравнения по pub_date идут с текстом другого формата.
+    return [connection.ops.adapt_datetimefield_value(value)
+            if isinstance(value, dt.datetime) else value for value in row]
+
+
+def insert_rows(table, columns, rows, batch_size):
+    """Вставляет строки пачками через executemany, минуя сигналы модели."""
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        table, ", ".join(columns), ", ".join(["%s"] * len(columns)))
+    inserted = 0
+    with connection.cursor() as cursor:
+        batch = []
+        for row in rows:
+            batch.append(adapt_row(row))
+            if len(batch) == batch_size:
+                cursor.executemany(sql, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+            inserted += len(batch)
+    return inserted
+
+
+class Command(BaseCommand):
+    help = ("Заполняет базу синтетическими данными: пользователи, подписки "
+            "со степенным распределением, посты с картинками, комментарии.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument("--follows", type=int, default=20,
+                            help="Среднее число подписок пользователя.")
+        parser.add_argument("--alpha", type=float, default=1.1,
+                            help="Показатель степенного распределения.")
+        parser.add_argument("--images", type=float, default=0.2,
+                            help="Доля постов с картинкой.")
+        parser.add_argument("--days", type=int, default=365,
+                            help="За сколько дней распределить посты.")
+        parser.add_argument("--prefix", default="gen",
+                            help="Префикс имён пользователей и групп.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        started = time.monotonic()
+        with transaction.atomic():
+            user_ids = self.create_users()
+            group_ids = self.create_groups()
+            images = self.create_images()
+            popularity = power_law(len(user_ids), options["alpha"], self.rng)
+            self.report("Подписок", self.create_follows,
+                        user_ids, popularity)
+            self.report("Постов", self.create_posts,
+                        user_ids, group_ids, images, popularity)
+            self.report("Комментариев", self.create_comments, user_ids)
+        # Строки вставлены в обход сигналов, поэтому производные данные
+        # собираются теми же командами, что и после миграций.
+        call_command("recount", stdout=self.stdout)
+        call_command("rebuild_timelines", stdout=self.stdout)
+        call_command("rebuild_search_index", stdout=self.stdout)
+        call_command("rebuild_trending", stdout=self.stdout)
+        call_command("rebuild_recommendations", stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            "Готово за {:.1f} с".format(time.monotonic() - started)))
+
+    def report(self, title, create, *args):
+        started = time.monotonic()
+        rows = create(*args)
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write("{}: {} ({:.0f} строк/с)".format(
+            title, rows, rows / elapsed))
+
+    def create_users(self):
+        prefix = self.options["prefix"]
+        User.objects.bulk_create(
+            [User(username="{}-user-{}".format(prefix, number),
+                  password="!")
+             for number in range(self.options["users"])]
+        )
+        return list(User.objects.filter(
+            username__startswith="{}-user-".format(prefix)
+        ).values_list("id", flat=True))
+
+    def create_groups(self):
+        prefix = self.options["prefix"]
+        Group.objects.bulk_create(
+            [Group(title="Группа {}".format(number),
+                   slug="{}-group-{}".format(prefix, number),
+                   description="Сгенерированная группа")
+             for number in range(self.options["groups"])],
+        )
+        return list(Group.objects.filter(
+            slug__startswith="{}-group-".format(prefix)
+        ).values_list("id", flat=True))
+
+    def create_images(self):
+        """Несколько картинок на диске, которые делят между собой посты."""
+        if not self.options["images"]:
+            return []
+        names = []
+        for number, color in enumerate(IMAGE_COLORS):
+            name = "posts/{}-{}.jpg".format(self.options["prefix"], number)
+            if not default_storage.exists(name):
+                content = io.BytesIO()
+                Image.new("RGB", IMAGE_SIZE, color).save(content, "JPEG")
+                name = default_storage.save(name,
+                                            ContentFile(content.getvalue()))
+            names.append(name)
+        return names
+
+    def create_follows(self, user_ids, popularity):
+        rng = self.rng
+        mean = self.options["follows"]
+
+        def rows():
+            for user_id in user_ids:
+                wanted = min(int(rng.expovariate(1 / mean)) if mean else 0,
+                             len(user_ids) - 1)
+                authors = set(rng.choices(user_ids, cum_weights=popularity,
+                                          k=wanted))
+                authors.discard(user_id)
+                for author_id in authors:
+                    yield user_id, author_id
+
+        return insert_rows(Follow._meta.db_table, ["user_id", "author_id"],
+                           rows(), self.options["batch_size"])
+
+    def create_posts(self, user_ids, group_ids, images, popularity):
+        rng = self.rng
+        total = self.options["posts"]
+        now = timezone.now()
+        step = dt.timedelta(days=self.options["days"]) / max(total, 1)
+        start = now - step * total
+
+        def rows():
+            authors = rng.choices(user_ids, cum_weights=popularity, k=total)
+            for number, author_id in enumerate(authors):
+                date = start + step * number
+                text = " ".join(rng.choices(WORDS, k=rng.randint(5, 40)))
+                image = ""
+                if images and rng.random() < self.options["images"]:
+                    image = rng.choice(images)
+                group_id = None
+                if group_ids and rng.random() < 0.7:
+                    group_id = rng.choice(group_ids)
+                yield (text.capitalize(), date, author_id, group_id, image,
+                       0, date, "")
+
+        return insert_rows(
+            Post._meta.db_table,
+            ["text", "pub_date", "author_id", "group_id", "image",
+             "comments_count", "updated", "thumbnails"],
+            rows(), self.options["batch_size"],
+        )
+
+    def create_comments(self, user_ids):
+        rng = self.rng
+        total = self.options["comments"]
+        prefix = self.options["prefix"]
+        posts = list(
+            Post.objects.filter(
+                author__username__startswith="{}-user-".format(prefix))
+            .order_by("-pub_date")
+            .values_list("id", "pub_date")
+        )
+        if not posts:
+            return 0
+        # Свежие посты комментируют чаще старых.
+        weights = power_law(len(posts), self.options["alpha"])
+        now = timezone.now()
+
+        def rows():
+            chosen = rng.choices(posts, cum_weights=weights, k=total)
+            for post_id, pub_date in chosen:
+                delay = dt.timedelta(minutes=rng.expovariate(1 / 120))
+                yield (post_id, rng.choice(user_ids),
+                       " ".join(rng.choices(WORDS, k=rng.randint(2, 15))),
+                       min(pub_date + delay, now))
+
+        return insert_rows(Comment._meta.db_table,
+                           ["post_id", "author_id", "text", "created"],
+                           rows(), self.options["batch_size"])
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Готовит превью для постов с картинками, у которых их ещё нет."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Пересоздать превью у всех постов.")
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image="").exclude(image__isnull=True)
+        if not options["all"]:
+            posts = posts.filter(thumbnails="")
+        done = 0
+        for post_id in posts.values_list("id", flat=True).iterator():
+            thumbnails.generate(post_id)
+            done += 1
+        self.stdout.write("Подготовлено превью: {}".format(done))
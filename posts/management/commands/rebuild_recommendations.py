@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рекомендации авторов для всех пользователей."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        graph = recommendations.FollowGraph.load()
+        loaded = time.monotonic()
+        users = recommendations.rebuild(options["batch_size"], graph)
+        self.stdout.write(self.style.SUCCESS(
+            "Пользователей: {}, граф загружен за {:.1f} с, всего {:.1f} с"
+            .format(users, loaded - started, time.monotonic() - started)))
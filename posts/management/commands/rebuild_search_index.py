@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Заполняет поисковый индекс постов пачками."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = Post.objects.aggregate(last=Max("pk"))["last"] or 0
+        indexed = 0
+        started = time.monotonic()
+        for start in range(0, last_pk + 1, batch_size):
+            posts = Post.objects.filter(
+                pk__gte=start, pk__lt=start + batch_size
+            ).only("id", "text")
+            with transaction.atomic():
+                search.index_posts(posts)
+            indexed += len(posts)
+            self.stdout.write("Проиндексировано постов: {}".format(indexed),
+                              ending="\r")
+        self.stdout.write("\nГотово за {:.1f} с".format(
+            time.monotonic() - started))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает счета популярности постов и групп по недавним "
+            "постам и комментариям.")
+
+    def handle(self, *args, **options):
+        posts, groups = trending.rebuild()
+        self.stdout.write("Популярных постов: {}, групп: {}".format(
+            posts, groups))
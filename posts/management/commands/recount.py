@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from posts import counters
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики постов, профилей и групп."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        jobs = [
+            ("постов", Post, counters.recount_posts),
+            ("профилей", User, counters.recount_users),
+            ("групп", Group, counters.recount_groups),
+        ]
+        for title, model, recount in jobs:
+            last_pk = model.objects.aggregate(last=Max("pk"))["last"] or 0
+            updated = 0
+            for start in range(0, last_pk + 1, batch_size):
+                with transaction.atomic():
+                    updated += recount(start, start + batch_size)
+            self.stdout.write("Пересчитано {}: {}".format(title, updated))
@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import jobs, recommendations, trending
+
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = "Воркер очереди фоновых задач."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int,
+                            default=settings.JOB_WORKERS,
+                            help="Размер пула потоков.")
+        parser.add_argument("--poll", type=float, default=1.0,
+                            help="Пауза между опросами пустой очереди, с.")
+        parser.add_argument("--once", action="store_true",
+                            help="Выполнить готовые задачи и выйти.")
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        done = failed = 0
+        maintained = 0
+        running = {}
+        with ThreadPoolExecutor(max_workers=workers,
+                                thread_name_prefix="jobs") as pool:
+            while True:
+                if time.monotonic() - maintained >= MAINTENANCE_INTERVAL:
+                    jobs.heartbeat(list(running.values()))
+                    jobs.release_stale()
+                    jobs.purge()
+                    trending.schedule_decay()
+                    recommendations.schedule_rebuild()
+                    maintained = time.monotonic()
+                finished = {future for future in running if future.done()}
+                for future in finished:
+                    del running[future]
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+                claimed = []
+                if len(running) < workers:
+                    claimed = jobs.claim(workers - len(running))
+                running.update({pool.submit(jobs.run_in_thread, job_id): job_id
+                                for job_id in claimed})
+                if claimed:
+                    continue
+                if options["once"] and not running:
+                    break
+                if running:
+                    wait(running, timeout=options["poll"],
+                         return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(options["poll"])
+        self.stdout.write("Выполнено задач: {}, с ошибкой: {}".format(
+            done, failed))
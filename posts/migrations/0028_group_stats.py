@@ -0,0 +1,101 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:48
+
+import json
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+TOP_AUTHORS = 3
+
+
+def fill_group_stats(apps, schema_editor):
+    # То же, что recount_groups, но на исторических моделях: иначе
+    # у существующих групп счёт начался бы с первой новой записи.
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    GroupAuthor = apps.get_model('posts', 'GroupAuthor')
+    GroupStats.objects.bulk_create(
+        [GroupStats(group_id=pk) for pk in
+         Group.objects.values_list('pk', flat=True).iterator()],
+        batch_size=1000,
+    )
+    GroupAuthor.objects.bulk_create(
+        [GroupAuthor(**row) for row in
+         Post.objects.filter(group__isnull=False)
+         .order_by()
+         .values('group_id', 'author_id')
+         .annotate(posts_count=Count('pk'))
+         .iterator()],
+        batch_size=1000,
+    )
+    group_posts = (Post.objects.filter(group=OuterRef('pk'))
+                   .order_by()
+                   .values('group'))
+    GroupStats.objects.update(
+        posts_count=Coalesce(Subquery(
+            group_posts.annotate(total=Count('pk')).values('total')), 0),
+        last_post_at=Subquery(
+            group_posts.annotate(last=Max('pub_date')).values('last')),
+    )
+    for stats in GroupStats.objects.iterator():
+        top = (GroupAuthor.objects.filter(group_id=stats.group_id)
+               .order_by('-posts_count', 'author_id')
+               .values_list('author__username', 'posts_count')
+               [:TOP_AUTHORS])
+        stats.top_authors = json.dumps(list(top), ensure_ascii=False)
+        stats.save(update_fields=['top_authors'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0027_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+                ('last_post_at', models.DateTimeField(blank=True, null=True, verbose_name='Последняя запись')),
+                ('top_authors', models.TextField(blank=True, default='', editable=False, verbose_name='Активные авторы')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['-posts_count', '-group'], name='group_stats_posts'),
+        ),
+        migrations.AddField(
+            model_name='groupauthor',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_counts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='groupauthor',
+            name='group',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='author_counts', to='posts.Group'),
+        ),
+        migrations.AddIndex(
+            model_name='groupauthor',
+            index=models.Index(fields=['group', '-posts_count'], name='group_author_posts'),
+        ),
+        migrations.AddConstraint(
+            model_name='groupauthor',
+            constraint=models.UniqueConstraint(fields=('group', 'author'), name='group_author'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
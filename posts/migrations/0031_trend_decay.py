@@ -0,0 +1,20 @@
+# Generated by Django 2.2.6 on 2026-10-18 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0030_recommendation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendDecay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('decayed_at', models.DateTimeField(verbose_name='Последнее затухание')),
+            ],
+        ),
+    ]
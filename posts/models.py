@@ -1,5 +1,8 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -28,13 +31,49 @@ class Post(models.Model):
                               help_text="Группа из существующих")
     image = models.ImageField(upload_to="posts/", blank=True,
                               null=True)
+    comments_count = models.PositiveIntegerField("Комментариев", default=0,
+                                                 editable=False)
+    updated = models.DateTimeField("Дата изменения", auto_now=True)
+    thumbnails = models.TextField("Превью", blank=True, default="",
+                                  editable=False)
 
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(fields=["author", "-pub_date", "-id"],
+                         name="post_author_date"),
+            models.Index(fields=["group", "-pub_date", "-id"],
+                         name="post_group_date"),
+            models.Index(fields=["-pub_date", "-id"],
+                         name="post_date"),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @property
+    def thumbnail_variants(self):
+        """Готовые превью картинки: ``[(ширина, url), ...]`` по убыванию."""
+        if not self.thumbnails:
+            return []
+        return sorted(
+            ((int(size.split("x")[0]), url)
+             for size, url in json.loads(self.thumbnails).items()),
+            reverse=True
+        )
+
+    @property
+    def thumbnail_url(self):
+        variants = self.thumbnail_variants
+        if variants:
+            return variants[0][1]
+        return self.image.url if self.image else ""
+
+    @property
+    def thumbnail_srcset(self):
+        return ", ".join("{} {}w".format(url, width)
+                         for width, url in self.thumbnail_variants)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
@@ -49,6 +88,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["post", "-created", "-id"],
+                         name="comment_post_created"),
+        ]
 
     def __str__(self):
         return self.text
@@ -68,3 +111,202 @@ class Follow(models.Model):
                     "author"],
                 name="following")
         ]
+        indexes = [
+            models.Index(fields=["author", "user"],
+                         name="follow_author_user"),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики профиля, которые обновляются при записи."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name="stats")
+    posts_count = models.PositiveIntegerField("Записей", default=0)
+    followers_count = models.PositiveIntegerField("Подписчиков", default=0)
+    following_count = models.PositiveIntegerField("Подписок", default=0)
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class GroupStats(models.Model):
+    """Сводка группы для каталога, которая обновляется при записи постов."""
+    group = models.OneToOneField(Group, on_delete=models.CASCADE,
+                                 primary_key=True,
+                                 related_name="stats")
+    posts_count = models.PositiveIntegerField("Записей", default=0)
+    last_post_at = models.DateTimeField("Последняя запись", blank=True,
+                                        null=True)
+    top_authors = models.TextField("Активные авторы", blank=True,
+                                   default="", editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-posts_count", "-group"],
+                         name="group_stats_posts"),
+        ]
+
+    def __str__(self):
+        return str(self.group_id)
+
+    @property
+    def top_author_list(self):
+        """``[(username, записей), ...]`` по убыванию числа записей."""
+        if not self.top_authors:
+            return []
+        return [tuple(item) for item in json.loads(self.top_authors)]
+
+
+class GroupAuthor(models.Model):
+    """Число записей автора в группе: из него выбираются активные авторы."""
+    group = models.ForeignKey(Group, on_delete=models.CASCADE,
+                              related_name="author_counts")
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="group_counts")
+    posts_count = models.PositiveIntegerField("Записей", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "group",
+                    "author"],
+                name="group_author")
+        ]
+        indexes = [
+            models.Index(fields=["group", "-posts_count"],
+                         name="group_author_posts"),
+        ]
+
+
+class PostTrend(models.Model):
+    """Затухающий счёт популярности поста."""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name="trend")
+    score = models.FloatField("Счёт", default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-score", "-post"], name="post_trend_score"),
+        ]
+
+
+class GroupTrend(models.Model):
+    """Затухающий счёт активности группы."""
+    group = models.OneToOneField(Group, on_delete=models.CASCADE,
+                                 primary_key=True,
+                                 related_name="trend")
+    score = models.FloatField("Счёт", default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-score"], name="group_trend_score"),
+        ]
+
+
+class TrendDecay(models.Model):
+    """Время последнего затухания счетов: одна строка на всю базу."""
+    decayed_at = models.DateTimeField("Последнее затухание")
+
+
+class Recommendation(models.Model):
+    """Автор, которого стоит предложить пользователю, и его счёт."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="recommendations")
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name="+")
+    score = models.FloatField("Счёт", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "user",
+                    "author"],
+                name="recommendation")
+        ]
+        indexes = [
+            models.Index(fields=["user", "-score"],
+                         name="recommendation_user_score"),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: id постов для каждого читателя."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name="timeline")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="timeline_entries")
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "user",
+                    "post"],
+                name="timeline_entry")
+        ]
+        indexes = [
+            models.Index(fields=["user", "-pub_date"],
+                         name="timeline_user_date"),
+        ]
+
+
+class SearchTerm(models.Model):
+    """Инвертированный индекс для поиска: термин и пост, где он встречается."""
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name="search_terms")
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "term",
+                    "post"],
+                name="search_term_post")
+        ]
+
+
+class Job(models.Model):
+    """Фоновая задача: имя зарегистрированной функции и её аргументы."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Выполнена"),
+        (FAILED, "Ошибка"),
+    )
+
+    name = models.CharField("Задача", max_length=100)
+    key = models.CharField("Ключ идемпотентности", max_length=200,
+                           unique=True, blank=True, null=True)
+    payload = models.TextField("Аргументы", default="{}")
+    status = models.CharField("Статус", max_length=10, choices=STATUSES,
+                              default=QUEUED)
+    attempts = models.PositiveIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveIntegerField("Наибольшее число попыток",
+                                               default=5)
+    run_at = models.DateTimeField("Выполнить после", default=timezone.now)
+    locked_at = models.DateTimeField("Взята воркером", blank=True,
+                                     null=True)
+    created = models.DateTimeField("Создана", auto_now_add=True)
+    finished = models.DateTimeField("Завершена", blank=True, null=True)
+    last_error = models.TextField("Последняя ошибка", blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"],
+                         name="job_status_run_at"),
+        ]
+
+    def __str__(self):
+        return "{} #{}".format(self.name, self.id)
@@ -0,0 +1,206 @@
+import base64
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import SimpleLazyObject, cached_property
+
+
+def encode_cursor(obj, fields=("pub_date", "id")):
+    key_field, id_field = fields
+    key = getattr(obj, key_field)
+    if hasattr(key, "isoformat"):
+        key = key.isoformat()
+    raw = "{}|{}".format(key, getattr(obj, id_field))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(value, parse=parse_datetime):
+    if not value:
+        return None
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        key_value, id_value = raw.rsplit("|", 1)
+        key = parse(key_value)
+        if key is None:
+            return None
+        return key, int(id_value)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage(Sequence):
+    """Страница курсорной пагинации.
+
+    Повторяет интерфейс ``django.core.paginator.Page``, которым
+    пользуются шаблоны, но вместо номеров страниц отдаёт курсоры.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return "<KeysetPage after {}>".format(self.previous_cursor)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Пагинация поиском по ``(pub_date, id)`` без COUNT и OFFSET.
+
+    Вместо даты можно взять другое поле, например ранг в поиске:
+    ``parse`` превращает его значение из курсора обратно в объект.
+    """
+    is_keyset = True
+    page_range = range(0)
+
+    def __init__(self, object_list, per_page, fields=("pub_date", "id"),
+                 parse=parse_datetime):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.fields = fields
+        self.parse = parse
+
+    def _seek(self, cursor, direction):
+        # Условие на ключ вынесено отдельно, чтобы база шла диапазоном
+        # по составному индексу, а не объединяла два поиска через OR.
+        key_field, id_field = self.fields
+        key, pk = cursor
+        return (Q(**{"{}__{}e".format(key_field, direction): key})
+                & (Q(**{"{}__{}".format(key_field, direction): key})
+                   | Q(**{"{}__{}".format(id_field, direction): pk})))
+
+    def get_page(self, after=None, before=None):
+        key_field, id_field = self.fields
+        descending = ("-" + key_field, "-" + id_field)
+        limit = self.per_page + 1
+        queryset = self.object_list
+        has_next = has_previous = False
+        cursor = decode_cursor(before, self.parse)
+        if cursor is not None:
+            items = list(
+                queryset.filter(self._seek(cursor, "gt"))
+                .order_by(key_field, id_field)[:limit]
+            )
+            has_previous = len(items) > self.per_page
+            items = items[:self.per_page][::-1]
+            has_next = True
+        else:
+            cursor = decode_cursor(after, self.parse)
+            if cursor is not None:
+                queryset = queryset.filter(self._seek(cursor, "lt"))
+                has_previous = True
+            items = list(queryset.order_by(*descending)[:limit])
+            has_next = len(items) > self.per_page
+            items = items[:self.per_page]
+        next_cursor = previous_cursor = None
+        if items and has_next:
+            next_cursor = encode_cursor(items[-1], self.fields)
+        if items and has_previous:
+            previous_cursor = encode_cursor(items[0], self.fields)
+        return KeysetPage(items, self, next_cursor, previous_cursor)
+
+
+def paginate(request, queryset, per_page=None):
+    """Возвращает ``(paginator, page)`` для ленты постов.
+
+    Листание идёт только курсорами ``after``/``before``, номеров
+    страниц нет. Первая страница — обычные ``Paginator`` и ``Page``,
+    но без COUNT: из базы читается на одну запись больше страницы,
+    чтобы узнать, есть ли следующая.
+    """
+    per_page = int(per_page or settings.PER_PAGE)
+    queryset = queryset.order_by("-pub_date", "-id")
+    after = request.GET.get("after")
+    before = request.GET.get("before")
+    if after or before:
+        paginator = KeysetPaginator(queryset, per_page)
+        return paginator, paginator.get_page(after=after, before=before)
+    # Записи читаются лениво: при попадании в кэш фрагмента выборка
+    # постов страницы не выполняется.
+    rows = SimpleLazyObject(lambda: list(queryset[:per_page + 1]))
+    page = Page(SimpleLazyObject(lambda: rows[:per_page]), 1,
+                Paginator(queryset, per_page))
+    page.next_cursor = SimpleLazyObject(
+        lambda: encode_cursor(rows[per_page - 1])
+        if len(rows) > per_page else ""
+    )
+    page.previous_cursor = None
+    return page.paginator, page
+
+
+def estimate_count(queryset):
+    """Число строк таблицы по статистике базы или ``None``."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    queries = {
+        "postgresql": "SELECT reltuples::bigint FROM pg_class "
+                      "WHERE relname = %s",
+        "mysql": "SELECT table_rows FROM information_schema.tables "
+                 "WHERE table_schema = DATABASE() AND table_name = %s",
+        # Появляется после ANALYZE; первое число — строк в таблице.
+        "sqlite": "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1",
+    }
+    if connection.vendor not in queries:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(queries[connection.vendor], [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для админки, который не считает большие таблицы целиком.
+
+    Без фильтров число строк берётся из статистики базы, если она
+    больше ``ADMIN_COUNT_LIMIT``. Иначе COUNT останавливается на
+    ``ADMIN_COUNT_LIMIT`` строк после начала страницы ``page``: если
+    строк больше, ``capped`` истинно, а из списка доступны следующие
+    страницы в пределах этого окна.
+    """
+
+    def __init__(self, *args, page=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_number = page
+        self.capped = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimate_count(queryset)
+            if estimate is not None and estimate > limit:
+                return estimate
+        bound = (self.page_number - 1) * self.per_page + limit
+        count = queryset.order_by()[:bound + 1].count()
+        self.capped = count > bound
+        return min(count, bound)
@@ -0,0 +1,182 @@
+"""Рекомендации авторов: «кого почитать».
+
+Счёт кандидата складывается из двух сигналов:
+
+* друзья друзей — за каждый путь «пользователь → автор → кандидат»
+  кандидат получает ``RECOMMENDATIONS_FRIEND_WEIGHT``;
+* совместные подписки — соседи автора это те, на кого чаще всего
+  подписаны его последние подписчики. Сосед получает
+  ``RECOMMENDATIONS_COFOLLOW_WEIGHT``, умноженный на долю таких
+  подписчиков.
+
+Полный пересчёт идёт по массивам смежности в памяти, новая подписка
+досчитывается несколькими запросами к Follow. Отписки учитывает
+только полный пересчёт, его воркер очереди ставит себе сам раз в
+``RECOMMENDATIONS_REBUILD_INTERVAL``.
+"""
+import heapq
+import time
+from array import array
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db import transaction
+from django.db.models import Count
+
+from . import cache, jobs
+from .models import Follow, Recommendation
+
+
+def top(scores, exclude, size=None):
+    """Лучшие кандидаты ``[(author_id, score)]`` без ``exclude``."""
+    size = size or settings.RECOMMENDATIONS_SIZE
+    return heapq.nlargest(
+        size,
+        ((author_id, score) for author_id, score in scores.items()
+         if author_id not in exclude),
+        key=lambda item: (item[1], -item[0]),
+    )
+
+
+class FollowGraph:
+    """Граф подписок в массивах смежности: ``{id: array(id, ...)}``.
+
+    Списки идут в порядке создания подписок, поэтому последние
+    подписчики автора — это хвост его массива.
+    """
+
+    def __init__(self, edges):
+        self.following = {}
+        self.followers = {}
+        for user_id, author_id in edges:
+            self.following.setdefault(user_id, array("l")).append(author_id)
+            self.followers.setdefault(author_id, array("l")).append(user_id)
+        self._neighbours = {}
+
+    @classmethod
+    def load(cls, chunk_size=10000):
+        return cls(Follow.objects.order_by("id")
+                   .values_list("user_id", "author_id")
+                   .iterator(chunk_size=chunk_size))
+
+    def neighbours(self, author_id):
+        """``[(сосед, доля подписчиков)]``, посчитанные один раз на автора."""
+        if author_id not in self._neighbours:
+            sample = self.followers.get(author_id, ())
+            sample = sample[-settings.RECOMMENDATIONS_SAMPLE:]
+            counts = Counter()
+            for user_id in sample:
+                counts.update(self.following[user_id])
+            counts.pop(author_id, None)
+            self._neighbours[author_id] = [
+                (neighbour, count / len(sample))
+                for neighbour, count in counts.most_common(
+                    settings.RECOMMENDATIONS_NEIGHBOURS)
+            ]
+        return self._neighbours[author_id]
+
+    def recommend(self, user_id):
+        fanout = settings.RECOMMENDATIONS_FANOUT
+        followed = self.following.get(user_id, ())
+        scores = Counter()
+        for author_id in followed[-fanout:]:
+            add_paths(scores, self.following.get(author_id, ())[-fanout:],
+                      self.neighbours(author_id))
+        return top(scores, {user_id, *followed})
+
+
+def add_paths(scores, friends, neighbours):
+    friend_weight = settings.RECOMMENDATIONS_FRIEND_WEIGHT
+    cofollow_weight = settings.RECOMMENDATIONS_COFOLLOW_WEIGHT
+    for candidate in friends:
+        scores[candidate] += friend_weight
+    for candidate, share in neighbours:
+        scores[candidate] += cofollow_weight * share
+
+
+def save(recommendations):
+    """Заменяет рекомендации пользователей: ``{user_id: [(id, score)]}``."""
+    with transaction.atomic():
+        Recommendation.objects.filter(
+            user_id__in=list(recommendations)).delete()
+        Recommendation.objects.bulk_create(
+            Recommendation(user_id=user_id, author_id=author_id, score=score)
+            for user_id, items in recommendations.items()
+            for author_id, score in items
+        )
+    cache.bump(*[cache.recommendation_scope(user_id)
+                 for user_id in recommendations])
+
+
+def rebuild(batch_size=500, graph=None):
+    """Полный пересчёт; возвращает число пользователей с подписками."""
+    graph = graph or FollowGraph.load()
+    user_ids = sorted(graph.following)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        save({user_id: graph.recommend(user_id) for user_id in batch})
+    # Кто отписался от всех, остаётся без рекомендаций.
+    stale = (Recommendation.objects.filter(user__follower__isnull=True)
+             .values_list("user_id", flat=True).distinct())
+    save({user_id: [] for user_id in stale})
+    return len(user_ids)
+
+
+def schedule_rebuild():
+    """Ставит полный пересчёт текущего интервала в очередь.
+
+    Как и у затухания популярного, ключ задачи — номер интервала, так
+    что пересчёт выполнится один раз на все воркеры.
+    """
+    slot = int(time.time() // settings.RECOMMENDATIONS_REBUILD_INTERVAL)
+    jobs.enqueue("recommendations.rebuild",
+                 key="recommendations-rebuild:{}".format(slot))
+
+
+def author_neighbours(author_id):
+    """То же, что ``FollowGraph.neighbours``, но запросами к базе."""
+    sample = list(Follow.objects.filter(author_id=author_id)
+                  .order_by("-id")
+                  .values_list("user_id", flat=True)
+                  [:settings.RECOMMENDATIONS_SAMPLE])
+    if not sample:
+        return []
+    counts = (Follow.objects.filter(user_id__in=sample)
+              .exclude(author_id=author_id)
+              .values("author_id")
+              .annotate(count=Count("id"))
+              .order_by("-count", "author_id")
+              .values_list("author_id", "count")
+              [:settings.RECOMMENDATIONS_NEIGHBOURS])
+    return [(neighbour, count / len(sample)) for neighbour, count in counts]
+
+
+def add_follow(user_id, author_id):
+    """Досчитывает рекомендации после новой подписки без полного пересчёта."""
+    scores = Counter(dict(Recommendation.objects.filter(user_id=user_id)
+                          .values_list("author_id", "score")))
+    friends = (Follow.objects.filter(user_id=author_id)
+               .order_by("-id")
+               .values_list("author_id", flat=True)
+               [:settings.RECOMMENDATIONS_FANOUT])
+    add_paths(scores, friends, author_neighbours(author_id))
+    followed = set(Follow.objects.filter(user_id=user_id)
+                   .values_list("author_id", flat=True))
+    save({user_id: top(scores, {user_id, *followed})})
+
+
+def for_user(user):
+    """Рекомендации ``[(author_id, username)]`` из кэша."""
+    if not user.is_authenticated:
+        return []
+    key = "recommendations:{}:{}".format(
+        user.id, cache.versions(cache.recommendation_scope(user.id)))
+    return django_cache.get_or_set(
+        key,
+        lambda: list(Recommendation.objects.filter(user=user)
+                     .order_by("-score", "author_id")
+                     .values_list("author_id", "author__username")
+                     [:settings.RECOMMENDATIONS_SHOWN]),
+        settings.FEED_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,111 @@
+import math
+import re
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import (Case, Count, F, IntegerField, Sum, Value,
+                              When)
+
+from .models import Post, SearchTerm
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+MIN_STEM_LENGTH = 3
+MAX_TERM_LENGTH = 64
+TOTAL_POSTS_KEY = "search:total-posts"
+
+STOP_WORDS = frozenset((
+    "и", "в", "во", "не", "что", "он", "на", "я", "с", "со", "как", "а",
+    "то", "все", "она", "так", "его", "но", "да", "ты", "к", "у", "же",
+    "вы", "за", "бы", "по", "только", "ее", "мне", "было", "вот", "от",
+    "меня", "еще", "нет", "о", "из", "ему", "теперь", "когда", "уже",
+    "для", "вам", "ну", "ли", "если", "или", "ни", "быть", "был", "до",
+    "the", "a", "an", "and", "or", "of", "to", "in", "is", "it", "on",
+))
+
+# Окончания русских слов от длинных к коротким: лёгкий стеммер,
+# которого хватает, чтобы «постами» и «пост» совпадали в поиске.
+ENDINGS = sorted((
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях", "ого", "его", "ому",
+    "ему", "ыми", "ими", "ешь", "ете", "ишь", "ите", "ует", "уют", "ться",
+    "тся", "ать", "ять", "еть", "ить", "ов", "ев", "ей", "ой", "ый", "ий",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ом", "ем", "ах", "ях", "ам",
+    "ям", "ую", "юю", "ют", "ут", "ет", "ит", "ат", "ят", "ал", "ял",
+    "ил", "ла", "ли", "ло", "а", "я", "ы", "и", "о", "е", "у", "ю", "ь",
+), key=len, reverse=True)
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and \
+                len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    """Разбивает текст на термины: нижний регистр, «ё» → «е», основы."""
+    terms = []
+    for word in WORD_RE.findall(text.lower().replace("ё", "е")):
+        if len(word) < 2 or word in STOP_WORDS:
+            continue
+        terms.append(stem(word)[:MAX_TERM_LENGTH])
+    return terms
+
+
+def index_posts(posts):
+    """Пересобирает записи инвертированного индекса для постов."""
+    posts = list(posts)
+    SearchTerm.objects.filter(post__in=[post.id for post in posts]).delete()
+    SearchTerm.objects.bulk_create(
+        [SearchTerm(term=term, post_id=post.id, weight=weight)
+         for post in posts
+         for term, weight in Counter(tokenize(post.text)).items()]
+    )
+
+
+def total_posts():
+    return cache.get_or_set(TOTAL_POSTS_KEY, Post.objects.count, 60 * 60)
+
+
+def nothing_found(queryset):
+    return queryset.none().annotate(
+        rank=Value(0, output_field=IntegerField()))
+
+
+def search_posts(queryset, query):
+    """Посты, содержащие хотя бы один термин запроса, с рангом TF-IDF.
+
+    Ранг — целое число, чтобы по нему можно было листать курсором.
+    """
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return nothing_found(queryset)
+    frequencies = dict(
+        SearchTerm.objects.filter(term__in=terms)
+        .values("term")
+        .annotate(posts=Count("id"))
+        .values_list("term", "posts")
+    )
+    if not frequencies:
+        return nothing_found(queryset)
+    total = max(total_posts(), 1)
+    weights = [
+        When(search_terms__term=term,
+             then=F("search_terms__weight")
+             * int(1000 * math.log(1 + total / posts)))
+        for term, posts in frequencies.items()
+    ]
+    return queryset.filter(search_terms__term__in=terms).annotate(
+        rank=Sum(Case(*weights, default=0, output_field=IntegerField()))
+    )
+
+
+def posts_with_terms(queryset, query):
+    """Посты, где есть все термины запроса; ``None``, если терминов нет."""
+    terms = set(tokenize(query))
+    if not terms:
+        return None
+    for term in terms:
+        queryset = queryset.filter(
+            id__in=SearchTerm.objects.filter(term=term).values("post_id"))
+    return queryset
@@ -0,0 +1,190 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import cache, counters, jobs, trending
+from .models import (Comment, Follow, Group, GroupAuthor, GroupStats, Post,
+                     Recommendation, User, UserStats)
+
+
+def refresh_followers(author_id):
+    # Правки и комментарии сбрасывают ленты всех подписчиков автора:
+    # за интервал это делает одна задача, а не по задаче на событие.
+    jobs.enqueue_coalesced("timeline.refresh_followers",
+                           key="refresh-followers:{}".format(author_id),
+                           interval=settings.TIMELINE_REFRESH_INTERVAL,
+                           author_id=author_id)
+
+
+def feed_scopes(author_id, group_ids):
+    scopes = [cache.GLOBAL_SCOPE, cache.author_scope(author_id)]
+    scopes += [cache.group_scope(group_id)
+               for group_id in group_ids if group_id is not None]
+    return scopes
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    instance._loaded_username = instance.__dict__.get("username")
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif instance._loaded_username != instance.username:
+        user_renamed(instance)
+    instance._loaded_username = instance.username
+
+
+def user_renamed(user):
+    # Имя пользователя есть в карточках и страницах его постов, в
+    # комментариях, в профиле, в лентах подписчиков, в рекомендациях
+    # и в списках активных авторов каталога групп.
+    group_ids = list(GroupAuthor.objects.filter(author=user)
+                     .values_list("group_id", flat=True))
+    for group_id in group_ids:
+        counters.refresh_top_authors(group_id)
+    post_ids = set(Post.objects.filter(author=user)
+                   .values_list("id", flat=True))
+    post_ids.update(Comment.objects.filter(author=user)
+                    .values_list("post_id", flat=True))
+    recommended_to = (Recommendation.objects.filter(author=user)
+                      .values_list("user_id", flat=True))
+    cache.bump(
+        cache.user_scope(user.id),
+        cache.profile_scope(user.id),
+        cache.GROUPS_SCOPE,
+        *feed_scopes(user.id, group_ids),
+        *[cache.post_scope(post_id) for post_id in post_ids],
+        *[cache.recommendation_scope(user_id) for user_id in recommended_to],
+    )
+    refresh_followers(user.id)
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Группа до редактирования: её ленту тоже нужно сбросить.
+    instance._loaded_group_id = instance.__dict__.get("group_id")
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Раскладка по лентам подписчиков и индексация идут в очереди
+    # задач, а счётчики и версии лент обновляются сразу.
+    if update_fields is None or "text" in update_fields:
+        jobs.enqueue("search.index_post", post_id=instance.id)
+    scopes = [cache.post_scope(instance.id)]
+    moved_from = None if created else instance._loaded_group_id
+    if moved_from != instance.group_id:
+        if moved_from is not None:
+            counters.bump_group(moved_from, instance.author_id, -1,
+                                instance.pub_date)
+        if instance.group_id is not None:
+            counters.bump_group(instance.group_id, instance.author_id, 1,
+                                instance.pub_date)
+    if created:
+        counters.bump_user(instance.author_id, "posts_count", 1)
+        trending.record(instance.id, instance.group_id,
+                        settings.TRENDING_POST_WEIGHT)
+        scopes.append(cache.profile_scope(instance.author_id))
+        jobs.enqueue("timeline.fan_out",
+                     key="fan-out:{}".format(instance.id),
+                     post_id=instance.id)
+    else:
+        refresh_followers(instance.author_id)
+    cache.bump(
+        *scopes,
+        *feed_scopes(instance.author_id,
+                     {instance.group_id, instance._loaded_group_id})
+    )
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, "posts_count", -1)
+    if instance.group_id is not None:
+        counters.bump_group(instance.group_id, instance.author_id, -1,
+                            instance.pub_date)
+    refresh_followers(instance.author_id)
+    cache.bump(
+        cache.post_scope(instance.id),
+        cache.profile_scope(instance.author_id),
+        *feed_scopes(instance.author_id,
+                     {instance.group_id, instance._loaded_group_id})
+    )
+
+
+def comments_changed(comment):
+    post = (Post.objects.filter(id=comment.post_id)
+            .values("author_id", "group_id").first())
+    scopes = [cache.post_scope(comment.post_id)]
+    if post is not None:
+        scopes += feed_scopes(post["author_id"], [post["group_id"]])
+        refresh_followers(post["author_id"])
+    cache.bump(*scopes)
+    return post
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, 1)
+        post = comments_changed(instance)
+        if post is not None:
+            trending.record(instance.post_id, post["group_id"],
+                            settings.TRENDING_COMMENT_WEIGHT)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+    comments_changed(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, "followers_count", 1)
+        counters.bump_user(instance.user_id, "following_count", 1)
+        jobs.enqueue("timeline.add_author",
+                     key="follow:{}".format(instance.id),
+                     user_id=instance.user_id, author_id=instance.author_id)
+        jobs.enqueue("recommendations.add_follow",
+                     key="recommend:{}".format(instance.id),
+                     user_id=instance.user_id, author_id=instance.author_id)
+        cache.bump(cache.follow_scope(instance.user_id),
+                   cache.profile_scope(instance.user_id),
+                   cache.profile_scope(instance.author_id))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, "followers_count", -1)
+    counters.bump_user(instance.user_id, "following_count", -1)
+    jobs.enqueue("timeline.remove_author",
+                 key="unfollow:{}".format(instance.id),
+                 user_id=instance.user_id, author_id=instance.author_id)
+    cache.bump(cache.follow_scope(instance.user_id),
+               cache.profile_scope(instance.user_id),
+               cache.profile_scope(instance.author_id))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+    scopes = [cache.group_scope(instance.id), cache.GROUPS_SCOPE]
+    if not created:
+        # Название группы есть в карточках её постов во всех лентах.
+        author_ids = (GroupAuthor.objects.filter(group=instance)
+                      .values_list("author_id", flat=True))
+        scopes += [cache.GLOBAL_SCOPE, cache.group_info_scope(instance.id)]
+        scopes += [cache.author_scope(author_id) for author_id in author_ids]
+    cache.bump(*scopes)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    cache.bump(cache.GROUPS_SCOPE)
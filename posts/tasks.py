@@ -0,0 +1,64 @@
+from . import (cache, recommendations, search, thumbnails, timeline,
+               trending)
+from .jobs import task
+from .models import Follow, Post
+
+
+@task("search.index_post")
+def index_post(post_id):
+    post = Post.objects.filter(id=post_id).only("id", "text").first()
+    if post is not None:
+        search.index_posts([post])
+
+
+@task("timeline.fan_out")
+def fan_out(post_id):
+    post = Post.objects.filter(id=post_id).first()
+    if post is None:
+        return
+    followers = timeline.fan_out(post)
+    cache.bump(*[cache.follow_scope(user_id) for user_id in followers])
+
+
+@task("timeline.refresh_followers")
+def refresh_followers(author_id):
+    """Сбрасывает ленты подписчиков после правки поста или комментария."""
+    cache.bump(*[cache.follow_scope(user_id)
+                 for user_id in timeline.follower_ids(author_id)])
+
+
+@task("timeline.add_author")
+def add_author(user_id, author_id):
+    # Подписку могли отменить, пока задача ждала в очереди.
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        timeline.add_author(user_id, author_id)
+        cache.bump(cache.follow_scope(user_id))
+
+
+@task("recommendations.add_follow")
+def recommend_after_follow(user_id, author_id):
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        recommendations.add_follow(user_id, author_id)
+
+
+@task("recommendations.rebuild")
+def rebuild_recommendations():
+    recommendations.rebuild()
+
+
+@task("timeline.remove_author")
+def remove_author(user_id, author_id):
+    if not Follow.objects.filter(user_id=user_id,
+                                 author_id=author_id).exists():
+        timeline.remove_author(user_id, author_id)
+        cache.bump(cache.follow_scope(user_id))
+
+
+@task("thumbnails.generate")
+def generate_thumbnails(post_id):
+    thumbnails.generate(post_id)
+
+
+@task("trending.decay")
+def decay_trending():
+    trending.decay()
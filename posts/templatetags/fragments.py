@@ -0,0 +1,54 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cache
+from posts.conditional import mark_stale
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, timeout, name, version, vary):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.version = version
+        self.vary = vary
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        try:
+            timeout = int(timeout) if timeout is not None else None
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                '"fragment" tag got a non-integer timeout value: %r'
+                % timeout)
+        request = context.get("request")
+        return mark_safe(cache.fragment(
+            self.name.resolve(context),
+            self.version.resolve(context),
+            [value.resolve(context) for value in self.vary],
+            lambda: self.nodelist.render(context),
+            timeout,
+            on_stale=request and (lambda: mark_stale(request)),
+        ))
+
+
+@register.tag("fragment")
+def do_fragment(parser, token):
+    """Как ``{% cache %}``, но без лавины пересчётов при сбросе версии.
+
+        {% fragment timeout "name" version [vary ...] %} ... {% endfragment %}
+
+    Версия не входит в ключ прошлой записи, поэтому после сброса ленты
+    её отдают, пока новую считает один запрос.
+    """
+    nodelist = parser.parse(("endfragment",))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 4:
+        raise template.TemplateSyntaxError(
+            "'%r' tag requires at least 3 arguments." % bits[0])
+    timeout, name, version, *vary = (parser.compile_filter(bit)
+                                     for bit in bits[1:])
+    return FragmentNode(nodelist, timeout, name, version, vary)
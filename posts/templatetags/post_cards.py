@@ -0,0 +1,70 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts import cache as feed_cache
+
+register = template.Library()
+
+EDIT_BUTTON_PLACEHOLDER = "<!--post-edit-button-->"
+
+
+def card_scopes(post):
+    # Имя автора и название группы в карточке меняются без правки поста.
+    scopes = [feed_cache.user_scope(post.author_id)]
+    if post.group_id is not None:
+        scopes.append(feed_cache.group_info_scope(post.group_id))
+    return scopes
+
+
+def card_key(post, versions):
+    return "post-card:{}:{}:{}:{}".format(
+        post.id, post.updated.timestamp(), post.comments_count,
+        ".".join(versions[scope] for scope in card_scopes(post)))
+
+
+def render_card(post):
+    return render_to_string(
+        "posts/includes/post_item.html",
+        {
+            "post": post,
+            "card": True,
+            "edit_button_placeholder": EDIT_BUTTON_PLACEHOLDER,
+        }
+    )
+
+
+def with_edit_button(card, post, user):
+    button = ""
+    if user is not None and user.is_authenticated and \
+            user.id == post.author_id:
+        button = render_to_string("posts/includes/post_edit_button.html",
+                                  {"post": post})
+    return card.replace(EDIT_BUTTON_PLACEHOLDER, button)
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Собирает ленту из закэшированных карточек постов.
+
+    Карточка не зависит от читателя, кнопка «Редактировать» для автора
+    подставляется поверх готового HTML.
+    """
+    posts = list(posts)
+    versions = feed_cache.scope_versions(
+        scope for post in posts for scope in card_scopes(post))
+    keys = [card_key(post, versions) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            cards[key] = missing[key] = render_card(post)
+    if missing:
+        cache.set_many(missing, settings.FEED_CACHE_TIMEOUT)
+    user = context.get("user")
+    return mark_safe("".join(
+        with_edit_button(cards[key], post, user)
+        for key, post in zip(keys, posts)
+    ))
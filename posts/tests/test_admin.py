@@ -0,0 +1,147 @@
+import json
+
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+from posts.paginators import EstimatedCountPaginator
+
+POST_EXPORT_URL = reverse("admin:posts_post_export", args=["csv"])
+COMMENT_CHANGELIST_URL = reverse("admin:posts_comment_changelist")
+POST_CHANGELIST_URL = reverse("admin:posts_post_changelist")
+
+
+class AdminExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="admin")
+        cls.cats = Post.objects.create(text="Про кошек", author=cls.admin)
+        cls.dogs = Post.objects.create(text="Про собак", author=cls.admin)
+        cls.comments = [
+            Comment.objects.create(post=cls.cats, author=cls.admin,
+                                   text="Комментарий {}".format(number))
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_export_view_streams_filtered_rows(self):
+        """ Выгрузка списка учитывает поиск и отдаётся потоком """
+        response = self.client.get(POST_EXPORT_URL, {"q": "кошек"})
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,pub_date,author__username,"
+                                   "group__slug,text,image,comments_count")
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Про кошек", lines[1])
+
+    def test_export_view_rejects_bad_filters(self):
+        """ Неизвестный фильтр в выгрузке — ответ 400, а не ошибка """
+        response = self.client.get(POST_EXPORT_URL, {"nope__in": "1"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_changelist_links_to_export(self):
+        """ Над списком есть ссылки на выгрузку с текущими фильтрами """
+        response = self.client.get(POST_CHANGELIST_URL, {"q": "кошек"})
+        self.assertContains(response, POST_EXPORT_URL + "?q=")
+
+    def test_export_view_requires_staff(self):
+        """ Выгрузка недоступна обычному пользователю """
+        user = User.objects.create_user(username="user")
+        self.client.force_login(user)
+        response = self.client.get(POST_EXPORT_URL)
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_action_for_selected_rows(self):
+        """ Действие админки выгружает только отмеченные строки """
+        selected = self.comments[:2]
+        response = self.client.post(COMMENT_CHANGELIST_URL, {
+            "action": "export_jsonl",
+            "_selected_action": [comment.pk for comment in selected],
+        })
+        rows = [json.loads(line) for line in b"".join(
+            response.streaming_content).decode().splitlines()]
+        self.assertEqual(sorted(row["id"] for row in rows),
+                         sorted(comment.pk for comment in selected))
+        self.assertEqual(rows[0]["author__username"], "admin")
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="admin")
+        cls.group = Group.objects.create(title="title", slug="admin-group",
+                                         description="")
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def create_posts(self, count):
+        for number in range(count):
+            author = User.objects.create_user(
+                username="author{}".format(User.objects.count()))
+            post = Post.objects.create(text="Пост номер {}".format(number),
+                                       author=author, group=self.group)
+            Comment.objects.create(post=post, author=author, text="comment")
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """ Число запросов списка не зависит от числа строк """
+        self.create_posts(1)
+        queries = {url: self.count_queries(url)
+                   for url in (POST_CHANGELIST_URL, COMMENT_CHANGELIST_URL)}
+        self.create_posts(5)
+        for url, count in queries.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), count)
+
+    def test_search_uses_index(self):
+        """ Поиск в списке постов идёт по поисковому индексу """
+        self.create_posts(3)
+        Post.objects.create(text="Пост про кошек и собак", author=self.admin)
+        response = self.client.get(POST_CHANGELIST_URL,
+                                   {"q": "Собаки пост"})
+        self.assertEqual([post.text for post in
+                          response.context["cl"].result_list],
+                         ["Пост про кошек и собак"])
+
+    @override_settings(ADMIN_COUNT_LIMIT=2)
+    def test_estimated_count_paginator(self):
+        """ Paginator не считает строки дальше предела """
+        self.create_posts(4)
+        filtered = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group), 1)
+        self.assertEqual(filtered.count, 2)
+        self.assertTrue(filtered.capped)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        paginator = EstimatedCountPaginator(Post.objects.all(), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 4)
+
+    @override_settings(ADMIN_COUNT_LIMIT=2)
+    def test_capped_count_keeps_later_pages(self):
+        """ Урезанный COUNT показан как «N+», дальние страницы доступны """
+        self.create_posts(5)
+        params = {"group__id__exact": self.group.id}
+        response = self.client.get(POST_CHANGELIST_URL, params)
+        self.assertContains(response, "2+ posts")
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group), 1, page=4)
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(paginator.capped)
+        self.assertEqual(paginator.page(5).object_list.count(), 1)
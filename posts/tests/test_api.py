@@ -0,0 +1,81 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+USERNAME = "api-author"
+GROUP_SLUG = "api-group"
+API_INDEX_URL = reverse("api:index")
+API_GROUP_URL = reverse("api:group", args=[GROUP_SLUG])
+API_PROFILE_URL = reverse("api:profile", args=[USERNAME])
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.group = Group.objects.create(
+            title="title",
+            slug=GROUP_SLUG,
+            description="some information",
+        )
+        cls.posts = [
+            Post.objects.create(text="Пост {}".format(number),
+                                author=cls.user, group=cls.group)
+            for number in range(3)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.user,
+                               text="Комментарий")
+        cls.API_POST_URL = reverse("api:post", args=[cls.post.id])
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_feeds_use_keyset_cursors(self):
+        """ Ленты API листаются курсором """
+        for url in (API_INDEX_URL, API_GROUP_URL, API_PROFILE_URL):
+            with self.subTest(url=url):
+                first = self.client.get(url, {"limit": 2}).json()
+                self.assertEqual(len(first["results"]), 2)
+                self.assertIsNone(first["previous"])
+                second = self.client.get(
+                    url, {"limit": 2, "after": first["next"]}).json()
+                self.assertEqual([post["id"] for post in second["results"]],
+                                 [self.posts[0].id])
+                self.assertIsNone(second["next"])
+
+    def test_sparse_fields(self):
+        """ Параметр fields оставляет в ответе только нужные поля """
+        response = self.client.get(API_INDEX_URL, {"fields": "id,author"})
+        self.assertEqual(response.json()["results"][0],
+                         {"id": self.post.id, "author": USERNAME})
+        response = self.client.get(API_INDEX_URL, {"fields": "password"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail_with_comments(self):
+        """ Пост в API отдаётся вместе с комментариями """
+        data = self.client.get(self.API_POST_URL).json()
+        self.assertEqual(data["group"], GROUP_SLUG)
+        self.assertEqual(data["comments_count"], 1)
+        self.assertEqual(data["comments"][0]["text"], "Комментарий")
+
+    def test_not_modified_without_queries(self):
+        """ Неизменённый пост отдаётся как 304 без запросов к базе """
+        response = self.client.get(self.API_POST_URL)
+        with self.assertNumQueries(0):
+            cached = self.client.get(
+                self.API_POST_URL,
+                HTTP_IF_NONE_MATCH=response["ETag"],
+            )
+        self.assertEqual(cached.status_code, 304)
+
+    def test_write_changes_etag(self):
+        """ Новый пост меняет ETag ленты """
+        response = self.client.get(API_INDEX_URL)
+        Post.objects.create(text="Новый пост", author=self.user)
+        fresh = self.client.get(API_INDEX_URL,
+                                HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(fresh.status_code, 200)
+        self.assertEqual(fresh.json()["results"][0]["text"], "Новый пост")
@@ -5,7 +5,7 @@ import tempfile
 from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.forms import PostForm
@@ -14,13 +14,20 @@ from posts.models import Group, Post, User
 USERNAME = "antonio"
 INDEX_URL = reverse("index")
 NEW_POST_URL = reverse("new_post")
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
+             b'\x01\x00\x80\x00\x00\x00\x00\x00'
+             b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+             b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+             b'\x0A\x00\x3B'
+             )
 
 
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
 class PostFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        settings.MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
         cls.user = User.objects.create_user(username=USERNAME)
         cls.group = Group.objects.create(
             title="title",
@@ -55,16 +62,9 @@ class PostFormTests(TestCase):
     def test_create_post(self):
         """ Пост появляется в базе с верными аргументами, картинка загружается"""
         tasks_count = Post.objects.count()
-        small_gif = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
-                     b'\x01\x00\x80\x00\x00\x00\x00\x00'
-                     b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
-                     b'\x00\x00\x00\x2C\x00\x00\x00\x00'
-                     b'\x02\x00\x01\x00\x00\x02\x02\x0C'
-                     b'\x0A\x00\x3B'
-                     )
         uploaded = SimpleUploadedFile(
             name="small.gif",
-            content=small_gif,
+            content=SMALL_GIF,
             content_type="image/gif"
         )
         form_data = {
@@ -86,6 +86,25 @@ class PostFormTests(TestCase):
         self.assertEqual(created_post.image.file.read(),
                          form_data['image'].file.getvalue())
 
+    def test_thumbnails_generated_for_post_image(self):
+        """ Превью готовятся задачей очереди и попадают в карточку поста """
+        uploaded = SimpleUploadedFile(
+            name="thumb.gif",
+            content=SMALL_GIF,
+            content_type="image/gif"
+        )
+        self.authorized_client.post(
+            NEW_POST_URL,
+            data={"text": "with image", "image": uploaded},
+        )
+        created_post = Post.objects.get(text="with image")
+        self.assertEqual(
+            [width for width, url in created_post.thumbnail_variants],
+            [960, 480]
+        )
+        response = self.authorized_client.get(INDEX_URL)
+        self.assertContains(response, created_post.thumbnail_srcset)
+
     def test_edit_post(self):
         """ Пост обновляется в базе """
         tasks_count = Post.objects.count()
@@ -0,0 +1,124 @@
+import datetime as dt
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from posts import jobs
+from posts.models import Follow, Job, Post, TimelineEntry, User
+
+FAILURES = []
+
+
+@jobs.task("tests.flaky")
+def flaky(fail_times):
+    if len(FAILURES) < fail_times:
+        FAILURES.append(fail_times)
+        raise RuntimeError("Ошибка задачи")
+
+
+@override_settings(JOBS_INLINE=False, JOB_RETRY_DELAY=0)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        FAILURES.clear()
+
+    def run_ready(self):
+        for job_id in jobs.claim(10):
+            jobs.run(job_id)
+
+    def test_idempotency_key(self):
+        """ Задача с тем же ключом ставится в очередь один раз """
+        jobs.enqueue("tests.flaky", key="once", fail_times=0)
+        self.assertIsNone(jobs.enqueue("tests.flaky", key="once",
+                                       fail_times=0))
+        self.assertEqual(Job.objects.filter(key="once").count(), 1)
+
+    def test_claimed_job_not_taken_twice(self):
+        """ Взятую задачу не может забрать другой воркер """
+        jobs.enqueue("tests.flaky", fail_times=0)
+        self.assertEqual(len(jobs.claim(10)), 1)
+        self.assertEqual(jobs.claim(10), [])
+
+    def test_retries_then_fails(self):
+        """ Упавшая задача повторяется, пока не кончатся попытки """
+        with self.settings(JOB_MAX_ATTEMPTS=2):
+            job = jobs.enqueue("tests.flaky", fail_times=1)
+            failing = jobs.enqueue("tests.flaky", fail_times=10)
+        for _ in range(2):
+            with self.assertLogs("posts.jobs", "ERROR"):
+                self.run_ready()
+        job.refresh_from_db()
+        failing.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+        self.assertEqual(failing.status, Job.FAILED)
+        self.assertIn("Ошибка задачи", failing.last_error)
+
+    def test_failed_keyed_job_can_be_requeued(self):
+        """ Упавшую задачу с ключом можно поставить снова """
+        with self.settings(JOB_MAX_ATTEMPTS=1):
+            job = jobs.enqueue("tests.flaky", key="retry", fail_times=1)
+            with self.assertLogs("posts.jobs", "ERROR"):
+                self.run_ready()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        jobs.enqueue("tests.flaky", key="retry", fail_times=0)
+        self.run_ready()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+
+    def test_purge_removes_old_failed_jobs(self):
+        """ Давно упавшие задачи удаляются вместе с выполненными """
+        job = jobs.enqueue("tests.flaky", key="old", fail_times=0)
+        Job.objects.filter(id=job.id).update(
+            status=Job.FAILED,
+            finished=timezone.now() - dt.timedelta(days=30))
+        self.assertEqual(jobs.purge(), 1)
+
+    def test_heartbeat_keeps_running_job(self):
+        """ Задачу живого воркера не возвращают в очередь """
+        jobs.enqueue("tests.flaky", fail_times=0)
+        job_ids = jobs.claim(10)
+        Job.objects.update(locked_at=timezone.now() - dt.timedelta(days=1))
+        jobs.heartbeat(job_ids)
+        self.assertEqual(jobs.release_stale(), 0)
+        self.assertEqual(Job.objects.get().status, Job.RUNNING)
+
+    def test_coalesced_jobs_merge_within_interval(self):
+        """ Постановки за интервал сливаются в одну отложенную задачу """
+        for _ in range(3):
+            jobs.enqueue_coalesced("tests.flaky", key="merge",
+                                   interval=3600, fail_times=0)
+        job = Job.objects.get()
+        self.assertTrue(job.key.startswith("merge:"))
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_post_side_effects_are_queued(self):
+        """ Раскладка поста по лентам выполняется задачей """
+        author = User.objects.create_user(username="author")
+        reader = User.objects.create_user(username="reader")
+        Follow.objects.create(user=reader, author=author)
+        post = Post.objects.create(text="text", author=author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.run_ready()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=reader, post=post).exists())
+
+
+@override_settings(JOBS_INLINE=False)
+class RunJobsCommandTest(TransactionTestCase):
+    def test_worker_runs_queued_jobs(self):
+        """ Команда run_jobs выполняет задачи из очереди в пуле """
+        for _ in range(3):
+            jobs.enqueue("tests.flaky", fail_times=0)
+        out = StringIO()
+        call_command("run_jobs", once=True, workers=2, stdout=out)
+        # Три задачи теста, затухание популярного и пересчёт рекомендаций
+        # из обслуживания очереди.
+        self.assertIn("Выполнено задач: 5", out.getvalue())
+        self.assertEqual(Job.objects.filter(
+            name="tests.flaky", status=Job.DONE).count(), 3)
+        self.assertTrue(Job.objects.filter(
+            name="trending.decay", status=Job.DONE).exists())
+        self.assertTrue(Job.objects.filter(
+            name="recommendations.rebuild", status=Job.DONE).exists())
@@ -1,6 +1,10 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post, User
+from posts.models import (Comment, Follow, Group, GroupAuthor, GroupStats,
+                          Post, User, UserStats)
 
 
 class PostModelTest(TestCase):
@@ -54,3 +58,134 @@ class PostModelTest(TestCase):
         for string, method in strs.items():
             with self.subTest(string=string):
                 self.assertEquals(method, string)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.reader = User.objects.create(username="reader")
+        cls.post = Post.objects.create(text="some text", author=cls.author)
+
+    def test_counters_follow_writes(self):
+        """ Счётчики меняются вместе с записями """
+        Comment.objects.create(post=self.post, author=self.reader, text="1")
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(UserStats.objects.get(
+            user=self.reader).following_count, 1)
+        Follow.objects.filter(user=self.reader).delete()
+        self.post.comments.all().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(UserStats.objects.get(
+            user=self.author).followers_count, 0)
+
+    def test_decrement_does_not_go_below_zero(self):
+        """ Удаление при нулевом счётчике не нарушает ограничение """
+        comment = Comment.objects.create(post=self.post, author=self.reader,
+                                         text="1")
+        Post.objects.update(comments_count=0)
+        UserStats.objects.filter(user=self.author).update(posts_count=0)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        Post.objects.get().delete()
+        self.assertEqual(UserStats.objects.get(
+            user=self.author).posts_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """ Команда recount исправляет расхождения счётчиков """
+        Comment.objects.create(post=self.post, author=self.reader, text="1")
+        Post.objects.update(comments_count=42)
+        UserStats.objects.all().delete()
+        call_command("recount", stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(UserStats.objects.get(
+            user=self.author).posts_count, 1)
+
+
+class GroupStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username="author")
+        cls.reader = User.objects.create(username="reader")
+        cls.group = Group.objects.create(title="one", slug="one",
+                                         description="-")
+        cls.other = Group.objects.create(title="two", slug="two",
+                                         description="-")
+
+    def test_stats_follow_post_writes(self):
+        """ Сводка группы меняется вместе с её записями """
+        first = Post.objects.create(text="1", author=self.author,
+                                    group=self.group)
+        last = Post.objects.create(text="2", author=self.reader,
+                                   group=self.group)
+        Post.objects.create(text="3", author=self.author, group=self.group)
+        stats = GroupStats.objects.get(group=self.group)
+        self.assertEqual(stats.posts_count, 3)
+        self.assertEqual(stats.top_author_list,
+                         [("author", 2), ("reader", 1)])
+        last.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.top_author_list, [("author", 2)])
+        self.assertFalse(GroupAuthor.objects.filter(
+            author=self.reader).exists())
+        first.group = self.other
+        first.save()
+        stats.refresh_from_db()
+        moved = GroupStats.objects.get(group=self.other)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(moved.posts_count, 1)
+        self.assertEqual(moved.last_post_at, first.pub_date)
+
+    def test_last_post_recomputed_on_delete(self):
+        """ После удаления свежей записи дата берётся у предыдущей """
+        older = Post.objects.create(text="1", author=self.author,
+                                    group=self.group)
+        newer = Post.objects.create(text="2", author=self.author,
+                                    group=self.group)
+        newer.delete()
+        self.assertEqual(GroupStats.objects.get(
+            group=self.group).last_post_at, older.pub_date)
+        older.delete()
+        self.assertIsNone(GroupStats.objects.get(
+            group=self.group).last_post_at)
+
+    def test_recount_rebuilds_group_stats(self):
+        """ Команда recount восстанавливает сводки групп """
+        post = Post.objects.create(text="1", author=self.author,
+                                   group=self.group)
+        GroupStats.objects.all().delete()
+        GroupAuthor.objects.all().delete()
+        call_command("recount", stdout=StringIO())
+        stats = GroupStats.objects.get(group=self.group)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.last_post_at, post.pub_date)
+        self.assertEqual(stats.top_author_list, [("author", 1)])
+        self.assertEqual(GroupStats.objects.get(
+            group=self.other).posts_count, 0)
+
+
+class GenerateDataTest(TestCase):
+    def test_generate_data_builds_consistent_dataset(self):
+        """ Команда generate_data заполняет базу и производные данные """
+        call_command("generate_data", users=30, groups=3, posts=200,
+                     comments=300, follows=5, images=0, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        post = Post.objects.order_by("-comments_count").first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        follow = Follow.objects.first()
+        self.assertEqual(UserStats.objects.get(
+            user=follow.author).followers_count,
+            follow.author.following.count())
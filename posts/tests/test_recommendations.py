@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import recommendations
+from posts.models import Follow, Recommendation, User
+
+WEIGHTS = {
+    "RECOMMENDATIONS_FRIEND_WEIGHT": 1.0,
+    "RECOMMENDATIONS_COFOLLOW_WEIGHT": 2.0,
+}
+
+
+@override_settings(**WEIGHTS)
+class FollowGraphTest(TestCase):
+    def test_friends_and_cofollows_scored(self):
+        """ Друзья друзей и совместные подписки дают счёт кандидатам """
+        graph = recommendations.FollowGraph([
+            (1, 2), (2, 3), (2, 4), (5, 2), (5, 4),
+        ])
+        self.assertEqual(graph.neighbours(2), [(4, 0.5)])
+        self.assertEqual(graph.recommend(1), [(4, 2.0), (3, 1.0)])
+        self.assertEqual(graph.recommend(5), [(3, 2.0)])
+
+
+@override_settings(**WEIGHTS)
+class RecommendationsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.friend, cls.first, cls.second, cls.other = [
+            User.objects.create_user(username=username)
+            for username in ("reader", "friend", "first", "second", "other")
+        ]
+        for user, author in ((cls.friend, cls.first),
+                             (cls.friend, cls.second),
+                             (cls.other, cls.friend),
+                             (cls.other, cls.second)):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def stored(self, user):
+        return list(Recommendation.objects.filter(user=user)
+                    .order_by("-score", "author_id")
+                    .values_list("author__username", "score"))
+
+    def test_new_follow_updates_recommendations(self):
+        """ Новая подписка сразу досчитывает рекомендации """
+        Follow.objects.create(user=self.reader, author=self.friend)
+        self.assertEqual(self.stored(self.reader),
+                         [("second", 2.0), ("first", 1.0)])
+        Follow.objects.create(user=self.reader, author=self.second)
+        (username, score), = self.stored(self.reader)
+        self.assertEqual(username, "first")
+        self.assertGreater(score, 1.0)
+
+    def test_rebuild_matches_incremental(self):
+        """ Полный пересчёт совпадает с досчётом по подпискам """
+        Follow.objects.create(user=self.reader, author=self.friend)
+        incremental = self.stored(self.reader)
+        Recommendation.objects.all().delete()
+        call_command("rebuild_recommendations", stdout=StringIO())
+        self.assertEqual(self.stored(self.reader), incremental)
+
+    def test_scheduled_rebuild_forgets_unfollows(self):
+        """ Плановый пересчёт убирает рекомендации после отписки """
+        Follow.objects.create(user=self.reader, author=self.friend)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertNotEqual(self.stored(self.reader), [])
+        recommendations.schedule_rebuild()
+        self.assertEqual(self.stored(self.reader), [])
+
+    def test_rename_refreshes_cached_recommendations(self):
+        """ Новое имя рекомендованного автора видно в рекомендациях """
+        Follow.objects.create(user=self.reader, author=self.friend)
+        recommendations.for_user(self.reader)
+        self.second.username = "renamed"
+        self.second.save()
+        self.assertIn((self.second.id, "renamed"),
+                      recommendations.for_user(self.reader))
+        self.second.username = "second"
+        self.second.save()
+
+    def test_pages_show_cached_recommendations(self):
+        """ Рекомендации показываются на страницах и читаются из кэша """
+        Follow.objects.create(user=self.reader, author=self.friend)
+        response = self.client.get(reverse("follow_index"))
+        self.assertContains(response, reverse("profile", args=["second"]))
+        with self.assertNumQueries(0):
+            recommendations.for_user(self.reader)
+        response = self.client.get(reverse("profile", args=["other"]))
+        self.assertEqual(response.context["recommendations"],
+                         [(self.second.id, "second"),
+                          (self.first.id, "first")])
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, SearchTerm, User
+from posts.search import tokenize
+
+SEARCH_URL = reverse("search")
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="searcher")
+        cls.cats = Post.objects.create(
+            text="Кошки и кошки: всё о кошках",
+            author=cls.user,
+        )
+        cls.dogs = Post.objects.create(
+            text="Собаки любят кошку",
+            author=cls.user,
+        )
+        cls.birds = Post.objects.create(
+            text="Ёжики и птицы",
+            author=cls.user,
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_tokenize_normalizes_russian_words(self):
+        """ Токенизатор приводит формы слова к одной основе """
+        self.assertEqual(tokenize("Кошками"), tokenize("кошки"))
+        self.assertEqual(tokenize("ёжик"), tokenize("ежик"))
+        self.assertEqual(tokenize("и в на"), [])
+
+    def test_search_ranks_results(self):
+        """ Поиск находит все формы слова и ранжирует результаты """
+        response = self.client.get(SEARCH_URL, {"q": "кошка"})
+        self.assertEqual(list(response.context["page"]),
+                         [self.cats, self.dogs])
+
+    def test_search_index_follows_edits(self):
+        """ Индекс обновляется при изменении и удалении поста """
+        self.birds.text = "Птицы и кошки"
+        self.birds.save()
+        response = self.client.get(SEARCH_URL, {"q": "кошки"})
+        self.assertIn(self.birds, response.context["page"])
+        response = self.client.get(SEARCH_URL, {"q": "ежики"})
+        self.assertNotIn(self.birds, response.context["page"])
+        Post.objects.filter(id=self.dogs.id).delete()
+        self.assertFalse(SearchTerm.objects.filter(post_id=self.dogs.id))
+
+    @override_settings(PER_PAGE=1)
+    def test_search_keyset_pagination(self):
+        """ Результаты поиска листаются курсором """
+        response = self.client.get(SEARCH_URL, {"q": "кошки"})
+        first_page = response.context["page"]
+        response = self.client.get(
+            SEARCH_URL, {"q": "кошки", "after": first_page.next_cursor})
+        self.assertEqual(list(response.context["page"]), [self.dogs])
+
+    def test_rebuild_search_index_command(self):
+        """ Команда rebuild_search_index заполняет индекс """
+        SearchTerm.objects.all().delete()
+        call_command("rebuild_search_index", batch_size=2,
+                     stdout=StringIO())
+        response = self.client.get(SEARCH_URL, {"q": "птицы"})
+        self.assertEqual(list(response.context["page"]), [self.birds])
@@ -0,0 +1,94 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import transfer
+from posts.models import (Comment, Follow, Group, Post, PostTrend, User,
+                          UserStats)
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="title",
+            slug="transfer",
+            description="some information",
+        )
+        cls.post = Post.objects.create(text="Пост", author=cls.author,
+                                       group=cls.group)
+        Post.objects.filter(id=cls.post.id).update(
+            pub_date="2020-01-01T00:00:00.123456Z")
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text="Комментарий")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "yatube.jsonl.gz")
+
+    def test_export_import_round_trip(self):
+        """ Выгрузка загружается обратно со связями и датами """
+        call_command("export_yatube", self.path, stderr=StringIO())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        call_command("import_yatube", self.path, stdout=StringIO())
+        post = Post.objects.get()
+        self.assertEqual(post.id, self.post.id)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.pub_date.microsecond, 123456)
+        self.assertEqual(post.group.slug, "transfer")
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.comments.get().author.username, "reader")
+        self.assertTrue(Follow.objects.filter(
+            user__username="reader", author__username="author").exists())
+        self.assertEqual(UserStats.objects.get(
+            user__username="author").followers_count, 1)
+        self.assertTrue(PostTrend.objects.filter(post=post).exists())
+
+    def test_import_refreshes_cached_feeds(self):
+        """ Загруженные посты сразу видны в закэшированных лентах """
+        cache.clear()
+        client = Client()
+        urls = (reverse("index"), reverse("group", args=["transfer"]),
+                reverse("profile", args=["author"]))
+        for url in urls:
+            client.get(url)
+        call_command("export_yatube", self.path, stderr=StringIO())
+        call_command("import_yatube", self.path, skip_derived=True,
+                     stdout=StringIO())
+        imported = Post.objects.latest("id")
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), reverse(
+                    "post", args=["author", imported.id]))
+
+    def test_import_reuses_existing_users_and_groups(self):
+        """ Повторная загрузка не дублирует пользователей и группы """
+        call_command("export_yatube", self.path, stderr=StringIO())
+        call_command("import_yatube", self.path, skip_derived=True,
+                     stdout=StringIO())
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 2)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_rows_with_missing_links_are_skipped(self):
+        """ Записи со ссылкой на незагруженную запись пропускаются """
+        importer = transfer.Importer()
+        importer.load([
+            '{"model": "meta", "version": 1}',
+            '{"model": "comment", "id": 1, "post_id": 999, '
+            '"author_id": 1, "text": "x", "created": null}',
+        ])
+        self.assertEqual(importer.skipped["comment"], 1)
+        self.assertEqual(Comment.objects.filter(text="x").count(), 0)
@@ -0,0 +1,96 @@
+import datetime as dt
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import trending
+from posts.models import (Comment, Group, GroupTrend, Post, PostTrend,
+                          TrendDecay, User)
+
+TRENDING_URL = reverse("trending")
+
+
+@override_settings(TRENDING_POST_WEIGHT=3.0, TRENDING_COMMENT_WEIGHT=1.0,
+                   TRENDING_HALF_LIFE=600, TRENDING_DECAY_INTERVAL=600,
+                   TRENDING_MIN_SCORE=0.1, PER_PAGE=2)
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        cls.quiet = Group.objects.create(title="quiet", slug="quiet",
+                                         description="-")
+        cls.busy = Group.objects.create(title="busy", slug="busy",
+                                        description="-")
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.old = Post.objects.create(text="old", author=self.user,
+                                       group=self.quiet)
+        self.hot = Post.objects.create(text="hot", author=self.user,
+                                       group=self.busy)
+        self.new = Post.objects.create(text="new", author=self.user)
+        for _ in range(2):
+            Comment.objects.create(post=self.hot, author=self.user,
+                                   text="comment")
+
+    def score(self, post):
+        return PostTrend.objects.get(post=post).score
+
+    def elapse(self, seconds):
+        """Сдвигает время прошлого затухания назад."""
+        state = TrendDecay.objects.get()
+        state.decayed_at -= dt.timedelta(seconds=seconds)
+        state.save()
+
+    def test_writes_update_scores(self):
+        """ Пост и комментарии прибавляют вес посту и группе """
+        self.assertEqual(self.score(self.new), 3.0)
+        self.assertEqual(self.score(self.hot), 5.0)
+        self.assertEqual([trend.group for trend in trending.hot_groups()],
+                         [self.busy, self.quiet])
+
+    def test_decay_halves_scores_and_drops_faded(self):
+        """ Затухание уменьшает счета и удаляет угасшие """
+        trending.decay()
+        self.assertEqual(self.score(self.hot), 2.5)
+        self.elapse(600)
+        with override_settings(TRENDING_MIN_SCORE=2.0):
+            trending.decay()
+        self.assertFalse(PostTrend.objects.filter(post=self.new).exists())
+        self.assertEqual(list(GroupTrend.objects.values_list(
+            "group__slug", flat=True)), [])
+
+    def test_decay_catches_up_missed_intervals(self):
+        """ Затухание после простоя учитывает все пропущенные интервалы """
+        trending.decay()
+        self.elapse(3 * 600)
+        trending.decay()
+        self.assertAlmostEqual(self.score(self.hot), 5.0 / 16, places=3)
+
+    def test_repeated_decay_changes_nothing(self):
+        """ Повторное затухание сразу после прошлого почти не меняет счета """
+        trending.decay()
+        trending.decay()
+        self.assertAlmostEqual(self.score(self.hot), 2.5, places=3)
+
+    def test_trending_page_ranked_by_score(self):
+        """ Популярное листается по убыванию счёта """
+        first = self.guest_client.get(TRENDING_URL)
+        second = self.guest_client.get(
+            TRENDING_URL, {"after": first.context["page"].next_cursor})
+        self.assertEqual(list(first.context["page"]), [self.hot, self.new])
+        self.assertEqual(list(second.context["page"]), [self.old])
+        self.assertContains(first, reverse("group", args=["busy"]))
+
+    def test_rebuild_restores_scores(self):
+        """ Команда rebuild_trending восстанавливает счета """
+        PostTrend.objects.all().delete()
+        GroupTrend.objects.all().delete()
+        call_command("rebuild_trending", stdout=StringIO())
+        self.assertAlmostEqual(self.score(self.hot), 5.0, places=2)
+        self.assertEqual(GroupTrend.objects.count(), 2)
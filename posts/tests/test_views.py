@@ -1,8 +1,20 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
-from posts.models import Comment, Follow, Group, Post, User
+from posts import cache as feed_cache
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
 
 GROUP_ON_SLUG = "test-slug"
 GROUP_OFF_SLUG = "test-slug-1"
@@ -109,6 +121,88 @@ class PostsPagesTests(TestCase):
         #self.assertEqual(context_cache, post_len)
         self.assertHTMLEqual(str(response_1), str(response_2))
 
+    def test_cached_feeds_refresh_after_write(self):
+        """ Закэшированные ленты обновляются сразу после записи """
+        cache.clear()
+        for url in (INDEX_URL, GROUP_ON_URL, PROFILE_URL, self.POST_URL):
+            with self.subTest(url=url):
+                self.authorized_client.get(url)
+                Post.objects.filter(id=self.post.id).update(text="stale")
+                response = self.authorized_client.get(url)
+                self.assertContains(response, self.post.text)
+                post = Post.objects.get(id=self.post.id)
+                post.text = "fresh text"
+                post.save()
+                response = self.authorized_client.get(url)
+                self.assertContains(response, "fresh text")
+                post.text = self.post.text
+                post.save()
+
+    def test_new_comment_refreshes_post_page(self):
+        """ Новый комментарий сразу виден на странице поста """
+        cache.clear()
+        self.authorized_client.get(self.POST_URL)
+        self.authorized_client.post(self.ADD_COMMENT_URL,
+                                    data={"text": "brand new comment"})
+        response = self.authorized_client.get(self.POST_URL)
+        self.assertContains(response, "brand new comment")
+
+    def test_post_card_edit_button_only_for_author(self):
+        """ Кнопка редактирования в общей карточке видна только автору """
+        cache.clear()
+        author_client = Client()
+        author_client.force_login(self.user)
+        response = author_client.get(INDEX_URL)
+        self.assertContains(response, reverse(
+            "post_edit", args=[USERNAME, self.post.id]))
+        response = self.authorized_client.get(INDEX_URL)
+        self.assertNotContains(response, reverse(
+            "post_edit", args=[USERNAME, self.post.id]))
+        self.assertNotContains(response, "post-edit-button")
+
+    def test_post_card_rendered_once(self):
+        """ Карточка поста берётся из кэша для разных лент """
+        cache.clear()
+        self.authorized_client.get(INDEX_URL)
+        with self.assertTemplateNotUsed("posts/includes/post_item.html"):
+            self.authorized_client.get(GROUP_ON_URL)
+
+    def test_post_card_follows_renames(self):
+        """ Карточка обновляется после смены имени автора и группы """
+        cache.clear()
+        self.authorized_client.get(INDEX_URL)
+        group = Group.objects.get(slug=GROUP_ON_SLUG)
+        group.title = "renamed group"
+        group.save()
+        author = User.objects.get(username=USERNAME)
+        author.username = "renamed-author"
+        author.save()
+        for url in (INDEX_URL, reverse("profile", args=["renamed-author"])):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, "#renamed group")
+                self.assertContains(response, "@renamed-author")
+
+    def test_rename_refreshes_post_page_and_follow_feed(self):
+        """ Страница поста и лента подписчика видят новое имя автора """
+        Follow.objects.create(user=self.user_follow, author=self.user)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text="comment")
+        cache.clear()
+        post_url = reverse("post", args=[USERNAME, self.post.id])
+        self.authorized_client.get(post_url)
+        self.authorized_client.get(FOLLOW_INDEX_URL)
+        author = User.objects.get(username=USERNAME)
+        author.username = "renamed-author"
+        author.save()
+        post_url = reverse("post", args=["renamed-author", self.post.id])
+        for url in (post_url, FOLLOW_INDEX_URL):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, "@renamed-author")
+                self.assertNotContains(
+                    response, reverse("profile", args=[USERNAME]))
+
     def test_post_for_follow(self):
         """У пользователя в follow появляется пост автора"""
         """на которого он подписан"""
@@ -136,6 +230,39 @@ class PostsPagesTests(TestCase):
         self.assertEqual(comment.post, self.post)
         self.assertEqual(comment.text, form_data["text"])
 
+    def test_new_post_fans_out_to_followers(self):
+        """ Новый пост попадает в готовую ленту подписчика """
+        Follow.objects.create(user=self.user_follow, author=self.user)
+        author_client = Client()
+        author_client.force_login(self.user)
+        author_client.post(NEW_POST_URL, data={"text": "fan out"})
+        post = Post.objects.get(text="fan out")
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user_follow, post=post).exists())
+
+    def test_unfollow_trims_timeline(self):
+        """ После отписки посты автора пропадают из готовой ленты """
+        self.authorized_client.get(PROFILE_FOLLOW_URL)
+        self.assertTrue(self.user_follow.timeline.exists())
+        self.authorized_client.get(PROFILE_UNFOLLOW_URL)
+        self.assertFalse(self.user_follow.timeline.exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_pull_author_posts_in_follow_index(self):
+        """ Посты автора с множеством подписчиков читаются при запросе """
+        Follow.objects.create(user=self.user_follow, author=self.user)
+        self.assertFalse(self.user_follow.timeline.exists())
+        response = self.authorized_client.get(FOLLOW_INDEX_URL)
+        self.assertIn(self.post, response.context["page"])
+
+    def test_rebuild_timelines_command(self):
+        """ Команда rebuild_timelines восстанавливает ленту """
+        Follow.objects.create(user=self.user_follow, author=self.user)
+        TimelineEntry.objects.all().delete()
+        call_command("rebuild_timelines", stdout=StringIO())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user_follow, post=self.post).exists())
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -156,7 +283,396 @@ class PaginatorViewsTest(TestCase):
         response = self.guest_client.get(INDEX_URL)
         self.assertEqual(len(response.context.get("page").object_list), 10)
 
-    def test_second_page_containse_three_records(self):
-        """ на второй странице верное значение постов """
+    def test_page_numbers_are_ignored(self):
+        """ номеров страниц нет: ?page= отдаёт первую страницу """
         response = self.guest_client.get(INDEX_URL + "?page=2")
-        self.assertEqual(len(response.context.get("page").object_list), 2)
+        self.assertEqual(len(response.context.get("page").object_list), 10)
+        self.assertNotContains(response, "page=")
+
+    def test_first_page_does_not_count_posts(self):
+        """ первая страница ленты не выполняет COUNT """
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(INDEX_URL)
+        self.assertFalse([query for query in queries
+                          if "COUNT(" in query["sql"].upper()])
+        self.assertContains(
+            response, "after={}".format(response.context["page"].next_cursor))
+
+    def test_cursor_page_continues_first_page(self):
+        """ курсор ?after= продолжает ленту без повторов """
+        response = self.guest_client.get(INDEX_URL)
+        first_page = response.context.get("page")
+        response = self.guest_client.get(
+            INDEX_URL + "?after=" + str(first_page.next_cursor))
+        cursor_page = response.context.get("page")
+        self.assertEqual(len(cursor_page.object_list), 2)
+        self.assertFalse(cursor_page.has_next())
+        self.assertEqual(
+            list(first_page.object_list) + list(cursor_page.object_list),
+            list(Post.objects.order_by("-pub_date", "-id"))
+        )
+
+    def test_cursor_before_returns_previous_page(self):
+        """ курсор ?before= возвращает предыдущую страницу """
+        first_page = self.guest_client.get(INDEX_URL).context["page"]
+        cursor_page = self.guest_client.get(
+            INDEX_URL + "?after=" + str(first_page.next_cursor)
+        ).context["page"]
+        response = self.guest_client.get(
+            INDEX_URL + "?before=" + cursor_page.previous_cursor)
+        self.assertEqual(list(response.context["page"].object_list),
+                         list(first_page.object_list))
+
+    def test_broken_cursor_returns_first_page(self):
+        """ испорченный курсор отдаёт первую страницу """
+        response = self.guest_client.get(INDEX_URL + "?after=broken")
+        self.assertEqual(len(response.context.get("page").object_list), 10)
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="title",
+            slug=GROUP_ON_SLUG,
+            description="some information",
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def create_posts(self, count):
+        for post_num in range(count):
+            post = Post.objects.create(
+                text="some text" + str(post_num),
+                author=self.user,
+                group=self.group,
+            )
+            Comment.objects.create(post=post, author=self.reader,
+                                   text="comment")
+
+    def test_feed_query_count_does_not_depend_on_page_size(self):
+        """ Число запросов ленты не зависит от числа постов на странице """
+        urls_queries = [
+            [INDEX_URL, 3],
+            [GROUP_ON_URL, 4],
+            # Профиль и подписки читают ещё рекомендации авторов:
+            # кэш очищается перед каждым запросом.
+            [PROFILE_URL, 6],
+            [FOLLOW_INDEX_URL, 5],
+        ]
+        for posts_count in (1, 10):
+            Post.objects.all().delete()
+            self.create_posts(posts_count)
+            for url, queries in urls_queries:
+                with self.subTest(url=url, posts_count=posts_count):
+                    cache.clear()
+                    with self.assertNumQueries(queries):
+                        self.client.get(url)
+
+    def test_post_view_query_count(self):
+        """ Число запросов страницы поста не зависит от комментариев """
+        self.create_posts(1)
+        post = Post.objects.get()
+        for comment_num in range(10):
+            Comment.objects.create(post=post, author=self.user,
+                                   text="comment" + str(comment_num))
+        with self.assertNumQueries(4):
+            self.client.get(reverse("post", args=[USERNAME, post.id]))
+
+
+class ConditionalPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="title",
+            slug=GROUP_ON_SLUG,
+            description="some information",
+        )
+        cls.post = Post.objects.create(
+            text="some text",
+            author=cls.user,
+            group=cls.group,
+        )
+        cls.POST_URL = reverse("post", args=[USERNAME, cls.post.id])
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_guest_pages_are_public_and_revalidated(self):
+        """ Гостевые страницы кэшируются публично и отдают 304 """
+        for url in (GROUP_ON_URL, PROFILE_URL, self.POST_URL):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn("public", response["Cache-Control"])
+                self.assertIn("stale-while-revalidate",
+                              response["Cache-Control"])
+                self.assertIn("Cookie", response["Vary"])
+                repeated = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response["ETag"])
+                self.assertEqual(repeated.status_code, 304)
+
+    def test_if_modified_since_does_not_hide_writes(self):
+        """ Запись в ту же секунду не прячется за If-Modified-Since """
+        response = self.guest_client.get(self.POST_URL)
+        self.assertNotIn("Last-Modified", response)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text="same second")
+        response = self.guest_client.get(
+            self.POST_URL, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertContains(response, "same second")
+
+    def test_stale_fragment_page_is_not_cached(self):
+        """ Страница с прошлой версией ленты уходит без валидаторов """
+        cache.clear()
+        self.guest_client.get(GROUP_ON_URL)
+        feed_cache.bump(feed_cache.group_scope(self.group.id))
+        # Новую версию будто бы считает другой запрос.
+        with mock.patch.object(feed_cache.cache, "add", return_value=False):
+            response = self.guest_client.get(GROUP_ON_URL)
+        self.assertContains(response, "some text")
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertNotIn("public", response["Cache-Control"])
+        response = self.guest_client.get(GROUP_ON_URL)
+        self.assertIn("ETag", response)
+
+    def test_user_pages_are_private(self):
+        """ Страницы пользователя приватные и не совпадают с гостевыми """
+        guest = self.guest_client.get(PROFILE_URL)
+        response = self.authorized_client.get(PROFILE_URL)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotEqual(response["ETag"], guest["ETag"])
+        repeated = self.authorized_client.get(
+            PROFILE_URL, HTTP_IF_NONE_MATCH=guest["ETag"])
+        self.assertEqual(repeated.status_code, 200)
+
+    def test_new_login_changes_etag(self):
+        """ После нового входа и смены CSRF-токена страница не 304 """
+        etag = self.authorized_client.get(self.POST_URL)["ETag"]
+        self.authorized_client.logout()
+        self.authorized_client.force_login(self.reader)
+        response = self.authorized_client.get(self.POST_URL,
+                                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.authorized_client.cookies[settings.CSRF_COOKIE_NAME] = "new"
+        response = self.authorized_client.get(self.POST_URL,
+                                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_writes_change_etag(self):
+        """ Комментарий и подписка меняют ETag страниц """
+        writes = (
+            (self.POST_URL, lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text="comment")),
+            (PROFILE_URL, lambda: Follow.objects.create(
+                user=self.reader, author=self.user)),
+            (self.POST_URL, lambda: Follow.objects.filter(
+                user=self.reader, author=self.user).delete()),
+        )
+        for url, write in writes:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)["ETag"]
+                write()
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.post = Post.objects.create(text="some text", author=cls.user)
+        for comment_num in range(5):
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text="comment {}".format(comment_num))
+        cls.POST_URL = reverse("post", args=[USERNAME, cls.post.id])
+        cls.COMMENTS_URL = reverse("post_comments",
+                                   args=[USERNAME, cls.post.id])
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_post_page_renders_first_comments(self):
+        """ На странице поста только первая страница комментариев """
+        response = self.guest_client.get(self.POST_URL)
+        self.assertContains(response, "comment 4")
+        self.assertContains(response, "comment 3")
+        self.assertNotContains(response, "comment 2")
+        self.assertContains(response, self.COMMENTS_URL + "?after=")
+
+    def test_load_more_comments(self):
+        """ Следующие комментарии подгружаются по курсору """
+        cursor = self.guest_client.get(
+            self.POST_URL).context["comments_cursor"]
+        response = self.guest_client.get(self.COMMENTS_URL,
+                                         {"after": cursor})
+        self.assertEqual([comment.text for comment in
+                          response.context["comments"]],
+                         ["comment 2", "comment 1"])
+        last = self.guest_client.get(
+            self.COMMENTS_URL,
+            {"after": response.context["comments_cursor"]})
+        self.assertEqual([comment.text for comment in
+                          last.context["comments"]], ["comment 0"])
+        self.assertNotContains(last, "?after=")
+
+    def test_load_more_comments_json(self):
+        """ Комментарии листаются курсором и через API """
+        url = reverse("api:post_comments", args=[self.post.id])
+        first = self.guest_client.get(url, {"limit": 3}).json()
+        second = self.guest_client.get(
+            url, {"limit": 3, "after": first["next"]}).json()
+        self.assertEqual([comment["text"] for comment in second["results"]],
+                         ["comment 1", "comment 0"])
+        self.assertIsNone(second["next"])
+
+
+class GroupDirectoryTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        for group_num in range(3):
+            group = Group.objects.create(
+                title="group {}".format(group_num),
+                slug="group-{}".format(group_num),
+                description="-",
+            )
+            for post_num in range(group_num):
+                Post.objects.create(text="text", author=cls.user,
+                                    group=group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_directory_ordered_by_posts(self):
+        """ Каталог показывает группы по убыванию числа записей """
+        response = self.guest_client.get(reverse("groups"))
+        page = response.context["page"]
+        self.assertEqual([stats.group.slug for stats in page],
+                         ["group-2", "group-1", "group-0"])
+        self.assertEqual(page[0].top_author_list, [(USERNAME, 2)])
+        self.assertContains(response, reverse("group", args=["group-2"]))
+
+    def test_directory_follows_author_renames(self):
+        """ Активные авторы в каталоге обновляются после смены имени """
+        self.guest_client.get(reverse("groups"))
+        author = User.objects.get(id=self.user.id)
+        author.username = "renamed-author"
+        author.save()
+        response = self.guest_client.get(reverse("groups"))
+        self.assertEqual(response.context["page"][0].top_author_list,
+                         [("renamed-author", 2)])
+        self.assertContains(response, "renamed-author")
+
+    def test_directory_is_one_query(self):
+        """ Страница каталога читается одним запросом """
+        with self.assertNumQueries(1):
+            self.guest_client.get(reverse("groups"))
+
+    @override_settings(GROUPS_PER_PAGE=2)
+    def test_directory_pages(self):
+        """ Каталог листается курсором """
+        first = self.guest_client.get(reverse("groups")).context["page"]
+        second = self.guest_client.get(
+            reverse("groups"), {"after": first.next_cursor}
+        ).context["page"]
+        self.assertEqual([stats.group.slug for stats in second],
+                         ["group-0"])
+
+
+class BumpAfterCommitTest(TransactionTestCase):
+    def test_bump_repeats_after_commit(self):
+        """ Версия ленты меняется ещё раз после фиксации транзакции """
+        cache.clear()
+        with transaction.atomic():
+            feed_cache.bump(feed_cache.GLOBAL_SCOPE)
+            # Версия, которую мог прочитать параллельный запрос до
+            # того, как запись стала видна.
+            during = feed_cache.versions(feed_cache.GLOBAL_SCOPE)
+        self.assertNotEqual(feed_cache.versions(feed_cache.GLOBAL_SCOPE),
+                            during)
+
+
+class FeedFragmentTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self, html="html"):
+        def render():
+            self.calls += 1
+            time.sleep(0.1)
+            return html
+        return render
+
+    def test_fragment_is_computed_once(self):
+        """ Одновременные промахи фрагмента считают его один раз """
+        results = []
+        render = self.compute()
+
+        def request():
+            results.append(feed_cache.fragment("feed", "v1", [], render, 60))
+
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ["html"] * 8)
+
+    def test_stale_fragment_is_served_while_recomputing(self):
+        """ Пока новую версию считают, отдаётся прошлая """
+        feed_cache.fragment("feed", "v1", [1], self.compute("old"), 60)
+        fresh_key, _ = feed_cache._fragment_keys("feed", "v2", [1])
+        cache.add(feed_cache.LOCK_PREFIX + fresh_key, 1)
+        stale = []
+        html = feed_cache.fragment("feed", "v2", [1], self.compute("new"), 60,
+                                   on_stale=lambda: stale.append(True))
+        self.assertEqual(html, "old")
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(stale, [True])
+
+    def test_lock_taken_over_after_timeout_is_kept(self):
+        """ Долгий пересчёт не снимает чужую блокировку """
+        fresh_key, _ = feed_cache._fragment_keys("feed", "v1", [])
+        lock = feed_cache.LOCK_PREFIX + fresh_key
+
+        def render():
+            # Таймаут блокировки истёк, и её взял другой запрос.
+            cache.set(lock, "other")
+            return "html"
+
+        feed_cache.fragment("feed", "v1", [], render, 60)
+        self.assertEqual(cache.get(lock), "other")
+
+    def test_expired_fragment_is_recomputed(self):
+        """ Запись с истёкшим сроком пересчитывается """
+        feed_cache.fragment("feed", "v1", [], self.compute("old"), 60)
+        fresh_key, _ = feed_cache._fragment_keys("feed", "v1", [])
+        entry = cache.get(fresh_key)
+        entry["expires"] = time.time() - 1
+        cache.set(fresh_key, entry, 60)
+        html = feed_cache.fragment("feed", "v1", [], self.compute("new"), 60)
+        self.assertEqual(html, "new")
@@ -0,0 +1,33 @@
+import json
+
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+
+from . import jobs
+from .models import Post
+
+
+def generate(post_id):
+    """Готовит превью всех размеров и записывает их адреса в пост."""
+    post = Post.objects.filter(id=post_id).first()
+    if post is None or not post.image:
+        return
+    image_name = post.image.name
+    variants = {}
+    for size in settings.POST_THUMBNAIL_SIZES:
+        thumbnail = get_thumbnail(post.image, size,
+                                  crop="center", upscale=True)
+        variants[size] = thumbnail.url
+    post = Post.objects.filter(id=post_id, image=image_name).first()
+    if post is not None:
+        post.thumbnails = json.dumps(variants)
+        post.save(update_fields=["thumbnails", "updated"])
+
+
+def schedule(post):
+    """Ставит подготовку превью в очередь фоновых задач."""
+    jobs.enqueue(
+        "thumbnails.generate",
+        key="thumbnails:{}:{}".format(post.id, post.image.name),
+        post_id=post.id,
+    )
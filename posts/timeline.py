@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+
+def pull_authors(user):
+    """Авторы из подписок, чьи посты не раскладываются по лентам.
+
+    У таких авторов слишком много подписчиков, поэтому их посты
+    подмешиваются в ленту при чтении.
+    """
+    return list(
+        UserStats.objects
+        .filter(user__following__user=user,
+                followers_count__gt=settings.TIMELINE_FANOUT_LIMIT)
+        .values_list("user_id", flat=True)
+    )
+
+
+def is_pull_author(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).exists()
+
+
+def trim(user_ids):
+    size = settings.TIMELINE_SIZE
+    for user_id in user_ids:
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        oldest_kept = (entries.order_by("-pub_date")
+                       .values_list("pub_date", flat=True)[size - 1:size])
+        if oldest_kept:
+            entries.filter(pub_date__lt=oldest_kept[0]).delete()
+
+
+def follower_ids(author_id):
+    """Подписчики, в чьи ленты раскладываются посты автора."""
+    if is_pull_author(author_id):
+        return []
+    return list(Follow.objects.filter(author_id=author_id)
+                .values_list("user_id", flat=True))
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты всех подписчиков автора.
+
+    Возвращает id подписчиков, чьи ленты изменились.
+    """
+    followers = follower_ids(post.author_id)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers],
+        ignore_conflicts=True,
+    )
+    trim(followers)
+    return followers
+
+
+def add_author(user_id, author_id):
+    """Дописывает в ленту последние посты автора после подписки."""
+    if is_pull_author(author_id):
+        return
+    posts = (Post.objects.filter(author_id=author_id)
+             .order_by("-pub_date", "-id")
+             .values_list("id", "pub_date")[:settings.TIMELINE_SIZE])
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id,
+                                 post__author_id=author_id).delete()
+
+
+def rebuild(user):
+    TimelineEntry.objects.filter(user=user).delete()
+    pulled = pull_authors(user)
+    posts = (Post.objects.filter(author__following__user=user)
+             .exclude(author__in=pulled)
+             .order_by("-pub_date", "-id")
+             .values_list("id", "pub_date")[:settings.TIMELINE_SIZE])
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts]
+    )
+
+
+def timeline_posts(user, pulled=None):
+    """Посты ленты подписок: готовый список плюс «тяжёлые» авторы."""
+    condition = Q(id__in=TimelineEntry.objects.filter(user=user)
+                  .values("post_id"))
+    if pulled is None:
+        pulled = pull_authors(user)
+    if pulled:
+        condition |= Q(author__in=pulled)
+    return Post.objects.filter(condition)
@@ -0,0 +1,252 @@
+"""Выгрузка и загрузка данных в JSON Lines: одна запись на строку.
+
+Файл начинается с заголовка ``{"model": "meta", ...}``, дальше идут
+пользователи, группы, посты, комментарии и подписки — в таком
+порядке, чтобы при загрузке ссылки всегда указывали на уже
+загруженные записи.
+"""
+import datetime as dt
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from . import cache
+from .models import Comment, Follow, Group, Post, User
+
+FORMAT_VERSION = 1
+MODELS = (
+    ("user", User, ("id", "username", "first_name", "last_name", "email",
+                    "password", "is_active", "is_staff", "is_superuser",
+                    "date_joined", "last_login")),
+    ("group", Group, ("id", "title", "slug", "description")),
+    ("post", Post, ("id", "text", "pub_date", "updated", "author_id",
+                    "group_id", "image")),
+    ("comment", Comment, ("id", "post_id", "author_id", "text", "created")),
+    ("follow", Follow, ("user_id", "author_id")),
+)
+FOREIGN_KEYS = {
+    "post": {"author_id": "user", "group_id": "group"},
+    "comment": {"post_id": "post", "author_id": "user"},
+    "follow": {"user_id": "user", "author_id": "user"},
+}
+DATE_FIELDS = ("pub_date", "updated", "created", "date_joined", "last_login")
+# Записи, которые при загрузке сопоставляются с уже существующими.
+NATURAL_KEYS = {"user": "username", "group": "slug"}
+
+
+class Encoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder обрезает время до миллисекунд, а лента
+    # сортируется по (pub_date, id): порядок после загрузки поменялся бы.
+    def default(self, o):
+        if isinstance(o, dt.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def export_lines(chunk_size=2000, counts=None):
+    """Строки JSONL со всеми данными; память не растёт с объёмом базы."""
+    yield json.dumps({"model": "meta", "version": FORMAT_VERSION})
+    for name, model, fields in MODELS:
+        rows = (model.objects.order_by("pk").values(*fields)
+                .iterator(chunk_size=chunk_size))
+        for row in rows:
+            row["model"] = name
+            if counts is not None:
+                counts[name] += 1
+            yield json.dumps(row, cls=Encoder, ensure_ascii=False)
+
+
+@contextmanager
+def keep_dates(*models):
+    """Отключает auto_now и auto_now_add, чтобы даты из файла сохранились."""
+    fields = [
+        field
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False)
+        or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+def touched_scopes(name, objects):
+    """Ленты, закэшированные страницы которых устарели после пачки."""
+    if name == "post":
+        for post in objects:
+            yield cache.author_scope(post.author_id)
+            yield cache.profile_scope(post.author_id)
+            if post.group_id is not None:
+                yield cache.group_scope(post.group_id)
+    elif name == "follow":
+        for follow in objects:
+            yield cache.follow_scope(follow.user_id)
+            yield cache.profile_scope(follow.user_id)
+            yield cache.profile_scope(follow.author_id)
+
+
+class Importer:
+    """Загружает записи пачками через ``bulk_create``.
+
+    Новый id записи — старый плюс сдвиг, равный наибольшему id таблицы
+    перед загрузкой, поэтому в пустую базу записи попадают с прежними
+    id, а ссылки переводятся без словаря всех загруженных строк.
+    Пользователи и группы с уже существующими username и slug не
+    создаются заново, на них переводятся ссылки: в памяти хранятся
+    только такие совпадения.
+    """
+
+    def __init__(self, batch_size=1000, media_from=None):
+        self.batch_size = batch_size
+        self.media_from = media_from
+        self.models = {name: model for name, model, fields in MODELS}
+        self.offsets = {}
+        self.merged = {name: {} for name in NATURAL_KEYS}
+        self.batch = []
+        self.batch_model = None
+        self.counts = Counter()
+        self.skipped = Counter()
+        # Ленты, в которые попали загруженные записи.
+        self.scopes = {cache.GLOBAL_SCOPE, cache.GROUPS_SCOPE}
+        self.elapsed = Counter()
+
+    def load(self, lines):
+        with keep_dates(*self.models.values()):
+            for line in lines:
+                line = line.strip()
+                if line:
+                    self.add(json.loads(line))
+            self.flush()
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), list(self.models.values())):
+                cursor.execute(sql)
+
+    def add(self, row):
+        name = row.pop("model")
+        if name == "meta":
+            if row.get("version") != FORMAT_VERSION:
+                raise ValueError("Неподдерживаемая версия формата: {}"
+                                 .format(row.get("version")))
+            return
+        if name not in self.models:
+            raise ValueError("Неизвестная модель: {}".format(name))
+        if name != self.batch_model:
+            self.flush()
+            self.batch_model = name
+        self.batch.append(row)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        name, rows = self.batch_model, self.batch
+        self.batch = []
+        started = time.monotonic()
+        with transaction.atomic():
+            objects = [obj for obj in self.build(name, rows)
+                       if obj is not None]
+            self.models[name].objects.bulk_create(
+                objects, ignore_conflicts=name == "follow")
+        self.counts[name] += len(objects)
+        self.elapsed[name] += time.monotonic() - started
+        self.scopes.update(touched_scopes(name, objects))
+
+    def build(self, name, rows):
+        model = self.models[name]
+        if name not in self.offsets:
+            self.offsets[name] = (
+                model.objects.aggregate(last=Max("pk"))["last"] or 0)
+        natural_key = NATURAL_KEYS.get(name)
+        existing = {}
+        if natural_key:
+            existing = dict(model.objects.filter(
+                **{natural_key + "__in": [row[natural_key] for row in rows]}
+            ).values_list(natural_key, "id"))
+        present = self.present_targets(name, rows)
+        for row in rows:
+            for field in DATE_FIELDS:
+                if row.get(field):
+                    row[field] = parse_datetime(row[field])
+            if not self.remap(name, row, present):
+                self.skipped[name] += 1
+                yield None
+                continue
+            old_id = row.pop("id", None)
+            if natural_key and row[natural_key] in existing:
+                self.merged[name][old_id] = existing[row[natural_key]]
+                yield None
+                continue
+            if old_id is not None:
+                row["id"] = old_id + self.offsets[name]
+            if row.get("image"):
+                row["image"] = self.copy_image(row["image"])
+            yield model(**row)
+
+    def target_id(self, target, old_id):
+        if old_id in self.merged.get(target, {}):
+            return self.merged[target][old_id]
+        if target not in self.offsets:
+            return None
+        return old_id + self.offsets[target]
+
+    def present_targets(self, name, rows):
+        """Какие из связанных записей пачки действительно загружены.
+
+        Ссылка на пропущенную запись (например, комментарий к посту
+        без автора) проверяется одним запросом к базе на пачку.
+        """
+        present = {}
+        for field, target in FOREIGN_KEYS.get(name, {}).items():
+            ids = {self.target_id(target, row[field]) for row in rows
+                   if row[field] is not None}
+            ids.discard(None)
+            present[target] = present.get(target, set()) | set(
+                self.models[target].objects.filter(id__in=ids)
+                .values_list("id", flat=True))
+        return present
+
+    def remap(self, name, row, present):
+        for field, target in FOREIGN_KEYS.get(name, {}).items():
+            if row[field] is None:
+                continue
+            new_id = self.target_id(target, row[field])
+            if new_id not in present[target]:
+                return False
+            row[field] = new_id
+        return True
+
+    def copy_image(self, image):
+        if not self.media_from or default_storage.exists(image):
+            return image
+        source = os.path.join(self.media_from, image)
+        if not os.path.exists(source):
+            return image
+        with open(source, "rb") as content:
+            return default_storage.save(image, File(content))
+
+    def rates(self):
+        """``[(модель, строк, строк/с)]`` для отчёта команды."""
+        return [
+            (name, self.counts[name],
+             self.counts[name] / max(self.elapsed[name], 1e-6))
+            for name, model, fields in MODELS if self.counts[name]
+        ]
@@ -0,0 +1,114 @@
+"""Популярные посты и активные группы.
+
+Новый пост и каждый комментарий прибавляют вес к счёту поста и его
+группы. Раз в ``TRENDING_DECAY_INTERVAL`` все счета умножаются на
+один и тот же множитель, так что вклад события уменьшается вдвое за
+``TRENDING_HALF_LIFE``. Множитель считается по времени с прошлого
+затухания, поэтому интервалы, пропущенные при простое воркера, не
+теряются. Порядок от общего затухания не меняется, поэтому чтение —
+это первые строки индекса по счёту.
+"""
+import datetime as dt
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache, counters, jobs
+from .models import Comment, GroupTrend, Post, PostTrend, TrendDecay
+
+# Вклад старше стольких периодов полураспада не учитывается.
+HORIZON_HALF_LIVES = 10
+
+
+def record(post_id, group_id, weight):
+    counters.bump_row(PostTrend, {"post_id": post_id}, "score", weight)
+    if group_id is not None:
+        counters.bump_row(GroupTrend, {"group_id": group_id}, "score",
+                          weight)
+
+
+def decay_factor(seconds):
+    return 0.5 ** (seconds / settings.TRENDING_HALF_LIFE)
+
+
+def decay():
+    """Затухание всех счетов за время с прошлого раза и удаление угасших."""
+    now = timezone.now()
+    state, _ = TrendDecay.objects.get_or_create(pk=1, defaults={
+        "decayed_at": now - dt.timedelta(
+            seconds=settings.TRENDING_DECAY_INTERVAL)})
+    seconds = (now - state.decayed_at).total_seconds()
+    if seconds <= 0:
+        return
+    with transaction.atomic():
+        # Условное обновление: из двух одновременных затуханий
+        # счета изменит только одно.
+        if not TrendDecay.objects.filter(
+                pk=1, decayed_at=state.decayed_at).update(decayed_at=now):
+            return
+        factor = decay_factor(seconds)
+        for model in (PostTrend, GroupTrend):
+            model.objects.update(score=F("score") * factor)
+            model.objects.filter(
+                score__lt=settings.TRENDING_MIN_SCORE).delete()
+    cache.bump(cache.TRENDING_SCOPE)
+
+
+def schedule_decay():
+    """Ставит затухание текущего интервала в очередь.
+
+    Ключ задачи — номер интервала, поэтому сколько бы воркеров ни
+    вызвали эту функцию, затухание выполнится один раз.
+    """
+    slot = int(time.time() // settings.TRENDING_DECAY_INTERVAL)
+    jobs.enqueue("trending.decay", key="trending-decay:{}".format(slot))
+
+
+def hot_groups(limit=None):
+    limit = limit or settings.TRENDING_GROUPS
+    return (GroupTrend.objects.select_related("group")
+            .order_by("-score")[:limit])
+
+
+def rebuild():
+    """Пересчитывает счета по постам и комментариям за горизонт.
+
+    Возвращает ``(постов, групп)`` с ненулевым счётом.
+    """
+    now = timezone.now()
+    horizon = now - dt.timedelta(
+        seconds=settings.TRENDING_HALF_LIFE * HORIZON_HALF_LIVES)
+    posts, groups = Counter(), Counter()
+    events = [
+        (settings.TRENDING_POST_WEIGHT,
+         Post.objects.filter(pub_date__gte=horizon)
+         .values_list("id", "group_id", "pub_date")),
+        (settings.TRENDING_COMMENT_WEIGHT,
+         Comment.objects.filter(created__gte=horizon)
+         .values_list("post_id", "post__group_id", "created")),
+    ]
+    for weight, rows in events:
+        for post_id, group_id, happened in rows.iterator():
+            score = weight * decay_factor((now - happened).total_seconds())
+            posts[post_id] += score
+            if group_id is not None:
+                groups[group_id] += score
+    minimum = settings.TRENDING_MIN_SCORE
+    post_trends = [PostTrend(post_id=post_id, score=score)
+                   for post_id, score in posts.items() if score >= minimum]
+    group_trends = [GroupTrend(group_id=group_id, score=score)
+                    for group_id, score in groups.items()
+                    if score >= minimum]
+    with transaction.atomic():
+        PostTrend.objects.all().delete()
+        GroupTrend.objects.all().delete()
+        PostTrend.objects.bulk_create(post_trends)
+        GroupTrend.objects.bulk_create(group_trends)
+        TrendDecay.objects.update_or_create(pk=1,
+                                            defaults={"decayed_at": now})
+    cache.bump(cache.TRENDING_SCOPE)
+    return len(post_trends), len(group_trends)
@@ -6,15 +6,24 @@ urlpatterns = [
     path("new/",
          views.new_post,
          name="new_post"),
+    path("groups/",
+         views.group_list,
+         name="groups"),
     path("group/<slug:slug>/",
          views.group_posts,
          name="group"),
     path("",
          views.index,
          name="index"),
+    path("trending/",
+         views.trending_posts,
+         name="trending"),
     path("follow/",
          views.follow_index,
          name="follow_index"),
+    path("search/",
+         views.search,
+         name="search"),
     path("<str:username>/",
          views.profile,
          name="profile"),
@@ -30,6 +39,9 @@ urlpatterns = [
     path("<str:username>/<int:post_id>/comment/",
          views.add_comment,
          name="add_comment"),
+    path("<str:username>/<int:post_id>/comments/",
+         views.post_comments,
+         name="post_comments"),
     path("<str:username>/follow/",
          views.profile_follow,
          name="profile_follow"),
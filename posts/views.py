@@ -2,39 +2,102 @@ import datetime as dt
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import urlencode
 from django.urls import reverse
 from django.views.decorators.cache import cache_page
 
+from . import cache, feeds, recommendations, thumbnails, trending
+from .conditional import conditional_page
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .models import Comment, Follow, Group, GroupStats, Post, User
+from .paginators import KeysetPaginator, encode_cursor, paginate
+from .search import search_posts
+from .timeline import pull_authors
 
 
 def index(request):
-    post_list = Post.objects.select_related('group')
-    paginator = Paginator(post_list, settings.PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return render(
-        request,
-        "posts/index.html",
-        {"page": page, "paginator": paginator}
-    )
+    post_list = feeds.index_feed()
+    paginator, page = paginate(request, post_list)
+    context = {
+        "page": page,
+        "paginator": paginator,
+        "feed_version": cache.versions(cache.GLOBAL_SCOPE)
+    }
+    return render(request, "posts/index.html", context)
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, settings.PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+
+    def respond():
+        post_list = feeds.group_feed(group)
+        paginator, page = paginate(request, post_list)
+        context = {
+            "group": group,
+            "page": page,
+            "paginator": paginator,
+            "feed_version": cache.versions(cache.group_scope(group.id))
+        }
+        return render(request, "group.html", context)
+
+    return conditional_page(request, [cache.group_scope(group.id)], respond)
+
+
+def group_list(request):
+    def respond():
+        # Сводки групп готовы заранее: страница — один запрос по индексу.
+        paginator = KeysetPaginator(
+            GroupStats.objects.select_related("group"),
+            settings.GROUPS_PER_PAGE,
+            fields=("posts_count", "group_id"),
+            parse=int
+        )
+        page = paginator.get_page(after=request.GET.get("after"),
+                                  before=request.GET.get("before"))
+        return render(request, "posts/groups.html",
+                      {"page": page, "paginator": paginator})
+
+    return conditional_page(request, [cache.GLOBAL_SCOPE, cache.GROUPS_SCOPE],
+                            respond)
+
+
+def trending_posts(request):
+    def respond():
+        paginator = KeysetPaginator(feeds.trending_feed(), settings.PER_PAGE,
+                                    fields=feeds.TRENDING_CURSOR, parse=float)
+        page = paginator.get_page(after=request.GET.get("after"),
+                                  before=request.GET.get("before"))
+        context = {
+            "page": page,
+            "paginator": paginator,
+            "hot_groups": trending.hot_groups(),
+        }
+        return render(request, "posts/trending.html", context)
+
+    scopes = [cache.GLOBAL_SCOPE, cache.TRENDING_SCOPE]
+    return conditional_page(request, scopes, respond)
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    paginator = KeysetPaginator(
+        search_posts(feeds.index_feed(), query),
+        settings.PER_PAGE,
+        fields=("rank", "id"),
+        parse=int
+    )
+    page = paginator.get_page(after=request.GET.get("after"),
+                              before=request.GET.get("before"))
     context = {
-        "group": group,
+        "query": query,
         "page": page,
-        "paginator": paginator
+        "paginator": paginator,
+        "query_prefix": urlencode({"q": query}) + "&"
     }
-    return render(request, "group.html", context)
+    return render(request, "posts/search.html", context)
 
 
 @login_required
@@ -44,7 +107,10 @@ def new_post(request):
         return render(request, "posts/new_post.html", {'form': form})
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    with transaction.atomic():
+        post.save()
+        if post.image:
+            thumbnails.schedule(post)
     return redirect("index")
 
 
@@ -58,7 +124,8 @@ def add_comment(request, username, post_id):
     comment = form.instance
     comment.author = request.user
     comment.post = post
-    comment.save()
+    with transaction.atomic():
+        comment.save()
     return redirect("post", username=username, post_id=post_id)
 
 
@@ -80,69 +147,127 @@ def post_edit(request, username, post_id):
             "post": post
         }
         return render(request, "posts/new_post.html", context)
-    form.save()
+    post = form.save(commit=False)
+    if "image" in form.changed_data:
+        post.thumbnails = ""
+    with transaction.atomic():
+        post.save()
+        if post.image and "image" in form.changed_data:
+            thumbnails.schedule(post)
     return redirect("post", username=username, post_id=post_id)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, settings.PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    following = (request.user.is_authenticated and
-                 request.user != author and
-                 Follow.objects.filter(user=request.user,
-                                       author=author).exists())
-    context = {
-        "author": author,
-        "page": page,
-        "paginator": paginator,
-        "following": following
-    }
-    return render(request, "posts/profile.html", context)
+    author = get_object_or_404(User.objects.select_related("stats"),
+                               username=username)
+
+    def respond():
+        posts = feeds.profile_feed(author)
+        paginator, page = paginate(request, posts)
+        following = (request.user.is_authenticated and
+                     request.user != author and
+                     Follow.objects.filter(user=request.user,
+                                           author=author).exists())
+        context = {
+            "author": author,
+            "page": page,
+            "paginator": paginator,
+            "following": following,
+            "recommendations": recommendations.for_user(request.user),
+            "feed_version": cache.versions(cache.author_scope(author.id))
+        }
+        return render(request, "posts/profile.html", context)
+
+    scopes = [cache.author_scope(author.id), cache.profile_scope(author.id)]
+    if request.user.is_authenticated:
+        scopes.append(cache.recommendation_scope(request.user.id))
+    return conditional_page(request, scopes, respond)
 
 
 def post_view(request, username, post_id):
     post = get_object_or_404(
-        Post,
+        feeds.post_detail(),
         id=post_id,
         author__username=username
     )
-    comments = post.comments.all()
-    form = CommentForm()
-    is_post = True
-    context = {
-        "author": post.author,
-        "post": post,
-        "comments": comments,
-        "form": form,
-        "is_post": is_post
-    }
-    return render(request, "posts/post.html", context)
+
+    def respond():
+        comments = feeds.first_comments(post)
+        form = CommentForm()
+        is_post = True
+        context = {
+            "author": post.author,
+            "post": post,
+            "comments": comments,
+            "comments_cursor": SimpleLazyObject(
+                lambda: next_comments_cursor(post, comments)),
+            "form": form,
+            "is_post": is_post,
+            "post_version": cache.versions(cache.post_scope(post.id))
+        }
+        return render(request, "posts/post.html", context)
+
+    scopes = [cache.post_scope(post.id), cache.profile_scope(post.author_id)]
+    return conditional_page(request, scopes, respond)
+
+
+def next_comments_cursor(post, comments):
+    # Число комментариев хранится в посте, поэтому есть ли следующая
+    # страница, видно без лишнего запроса.
+    if post.comments_count <= len(comments):
+        return ""
+    return encode_cursor(comments[len(comments) - 1], feeds.COMMENT_CURSOR)
+
+
+def post_comments(request, username, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related("author"),
+        id=post_id,
+        author__username=username
+    )
+
+    def respond():
+        paginator = KeysetPaginator(
+            feeds.post_comments(post),
+            settings.COMMENTS_PER_PAGE,
+            fields=feeds.COMMENT_CURSOR
+        )
+        page = paginator.get_page(after=request.GET.get("after"))
+        context = {
+            "post": post,
+            "comments": page,
+            "comments_cursor": page.next_cursor or ""
+        }
+        return render(request, "posts/includes/comment_list.html", context)
+
+    return conditional_page(request, [cache.post_scope(post.id)], respond)
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, settings.PER_PAGE)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return render(
-        request,
-        "posts/follow.html",
-        {"page": page, "paginator": paginator}
-    )
+    pulled = pull_authors(request.user)
+    post_list = feeds.follow_feed(request.user, pulled)
+    paginator, page = paginate(request, post_list)
+    scopes = [cache.follow_scope(request.user.id)]
+    scopes += [cache.author_scope(author_id) for author_id in pulled]
+    context = {
+        "page": page,
+        "paginator": paginator,
+        "recommendations": recommendations.for_user(request.user),
+        "feed_version": cache.versions(*scopes)
+    }
+    return render(request, "posts/follow.html", context)
 
 
 @login_required
 def profile_follow(request, username, post_id=None):
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=author
-        )
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                user=request.user,
+                author=author
+            )
     if post_id is None:
         return redirect("profile", username)
     else:
@@ -152,7 +277,8 @@ def profile_follow(request, username, post_id=None):
 @login_required
 def profile_unfollow(request, username, post_id=None):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    with transaction.atomic():
+        Follow.objects.filter(user=request.user, author=author).delete()
     if post_id is not None:
         return redirect("post", username, post_id)
     else:
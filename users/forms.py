@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
+from django.core.exceptions import ValidationError
+from django.urls import Resolver404, resolve, reverse
 
 User = get_user_model()
 
@@ -9,3 +11,15 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ("first_name", "last_name", "username", "email")
+
+    def clean_username(self):
+        # Профиль живёт по адресу /<username>/: имя вроде «groups» или
+        # «search» заняла бы страница сайта, и профиль был бы не виден.
+        username = self.cleaned_data["username"]
+        try:
+            match = resolve(reverse("profile", args=[username]))
+        except Resolver404:
+            return username
+        if match.url_name != "profile":
+            raise ValidationError("Это имя занято страницей сайта.")
+        return username
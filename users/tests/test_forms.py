@@ -0,0 +1,22 @@
+from django.test import TestCase
+
+from users.forms import CreationForm
+
+
+class CreationFormTest(TestCase):
+    def form(self, username):
+        return CreationForm(data={
+            "username": username,
+            "password1": "Sup3r-secret-pass",
+            "password2": "Sup3r-secret-pass",
+        })
+
+    def test_site_paths_are_reserved(self):
+        """ Имена, занятые страницами сайта, зарегистрировать нельзя """
+        for username in ("groups", "trending", "search", "follow", "new"):
+            with self.subTest(username=username):
+                self.assertIn("username", self.form(username).errors)
+
+    def test_regular_username_allowed(self):
+        """ Обычное имя проходит проверку """
+        self.assertTrue(self.form("reader").is_valid())
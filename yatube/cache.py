@@ -0,0 +1,413 @@
+"""Двухуровневый кэш: небольшой LRU в памяти процесса перед общим кэшем.
+
+Общий уровень (файловый кэш, Redis и т. п.) видят все воркеры, а
+локальный хранит недавно прочитанные значения не дольше
+``LOCAL_TIMEOUT`` секунд. Согласованность держится на версиях: ключи
+фрагментов содержат версию ленты и после записи не меняются, а сами
+версии (префиксы из ``SHARED_ONLY_PREFIXES``) всегда читаются из общего
+уровня. Поэтому сброс версии в одном воркере сразу виден остальным.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.TieredCache',
+            'OPTIONS': {
+                'SHARED': {
+                    'BACKEND': 'yatube.cache.FileCache',
+                    'LOCATION': '/var/tmp/yatube_cache',
+                },
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 5,
+                'SHARED_ONLY_PREFIXES': ['feed-version:'],
+            },
+        },
+    }
+"""
+import logging
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.utils.module_loading import import_string
+
+from .workers import WorkerRegistry, worker_name
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+STATS = ("local_hits", "shared_hits", "misses", "sets")
+STATS_PREFIX = "cache-metrics:"
+STATS_WORKER_KEY = "cache-metrics:worker:{}"
+STATS_TIMEOUT = 60 * 60 * 24
+# Префикс ключа для метрик — всё до первого ``:``, ``.`` или ``|``.
+PREFIX_RE = re.compile(r"[:.|]")
+
+# Локальный уровень общий для всех потоков процесса: Django создаёт
+# объект кэша на каждый поток.
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+# Время последней проверки размера файлового кэша по каталогам.
+_culled = {}
+
+
+def key_prefix(key):
+    return PREFIX_RE.split(str(key), 1)[0]
+
+
+class LocalTier:
+    """Ограниченный по числу записей LRU со сроком жизни записей."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            expires, pickled = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            self.delete(key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, pickled)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class FileCache(FileBasedCache):
+    """Файловый кэш, который не обходит весь каталог на каждой записи.
+
+    ``FileBasedCache`` перед каждой записью читает список всех файлов,
+    чтобы решить, не пора ли чистить кэш, и на сотне тысяч записей это
+    дороже самой записи. Здесь проверка идёт не чаще раза в
+    ``CULL_INTERVAL`` секунд на процесс, так что между проверками кэш
+    может ненадолго превысить ``MAX_ENTRIES``. Кроме того, ``add``
+    атомарен и между процессами: на нём держатся замки пересчёта.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self.cull_interval = params.get("OPTIONS", {}).get(
+            "CULL_INTERVAL", 60)
+
+    def _cull(self):
+        now = time.monotonic()
+        culled = _culled.get(self._dir)
+        if culled is not None and now - culled < self.cull_interval:
+            return
+        _culled[self._dir] = now
+        super()._cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Жёсткая ссылка не перезаписывает существующий файл, поэтому
+        # из двух одновременных ``add`` успешен только один.
+        self._createdir()
+        self._cull()
+        fname = self._key_to_file(key, version)
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, "wb") as f:
+                self._write_content(f, timeout, value)
+            for _ in range(2):
+                try:
+                    os.link(tmp_path, fname)
+                    return True
+                except FileExistsError:
+                    # ``has_key`` удаляет просроченный файл, тогда
+                    # пробуем ещё раз.
+                    if self.has_key(key, version=version):
+                        return False
+            return False
+        finally:
+            os.remove(tmp_path)
+
+
+class Stats:
+    """Попадания и промахи по префиксам ключей в этом процессе."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.flushed = time.monotonic()
+
+    def add(self, prefix, name, count=1):
+        with self.lock:
+            self.counters.setdefault(prefix, Counter())[name] += count
+
+    def snapshot(self):
+        with self.lock:
+            return {prefix: dict(counter)
+                    for prefix, counter in self.counters.items()}
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        shared = dict(options["SHARED"])
+        self.shared = import_string(shared.pop("BACKEND"))(
+            shared.get("LOCATION", ""), shared)
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 5)
+        self.shared_only = tuple(options.get("SHARED_ONLY_PREFIXES", ()))
+        self.lock_timeout = options.get("LOCK_TIMEOUT", 30)
+        self.lock_poll = options.get("LOCK_POLL", 0.05)
+        self.stats_interval = options.get("STATS_FLUSH_INTERVAL", 10)
+        name = location or repr(sorted(shared.items()))
+        with _local_tiers_lock:
+            if name not in _local_tiers:
+                _local_tiers[name] = (
+                    LocalTier(options.get("LOCAL_MAX_ENTRIES", 1000)),
+                    Stats(),
+                    {},
+                    WorkerRegistry(STATS_PREFIX, STATS_TIMEOUT),
+                )
+        (self.local, self.stats, self._flights,
+         self._workers) = _local_tiers[name]
+
+    # Ключи и локальный уровень
+
+    def _local_key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    def _is_local(self, key):
+        return not str(key).startswith(self.shared_only)
+
+    def _local_ttl(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None:
+            return self.local_timeout
+        return min(self.local_timeout, timeout - time.time())
+
+    def _remember(self, key, value, version, timeout=DEFAULT_TIMEOUT):
+        if self._is_local(key):
+            self.local.set(self._local_key(key, version), value,
+                           self._local_ttl(timeout))
+
+    def _forget(self, key, version):
+        self.local.delete(self._local_key(key, version))
+
+    def _count(self, key, name):
+        self.stats.add(key_prefix(key), name)
+        if time.monotonic() - self.stats.flushed >= self.stats_interval:
+            self.flush_stats()
+
+    # API кэша Django
+
+    def get(self, key, default=None, version=None):
+        if self._is_local(key):
+            value = self.local.get(self._local_key(key, version))
+            if value is not MISSING:
+                self._count(key, "local_hits")
+                return value
+        value = self.shared.get(key, MISSING, version=version)
+        if value is MISSING:
+            self._count(key, "misses")
+            return default
+        self._count(key, "shared_hits")
+        self._remember(key, value, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        for key in keys:
+            value = MISSING
+            if self._is_local(key):
+                value = self.local.get(self._local_key(key, version))
+            if value is MISSING:
+                remote.append(key)
+            else:
+                self._count(key, "local_hits")
+                found[key] = value
+        if remote:
+            shared = self.shared.get_many(remote, version=version)
+            for key in remote:
+                if key in shared:
+                    self._count(key, "shared_hits")
+                    self._remember(key, shared[key], version)
+                else:
+                    self._count(key, "misses")
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._count(key, "sets")
+        self._remember(key, value, version, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._count(key, "sets")
+                self._remember(key, value, version, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._count(key, "sets")
+            self._remember(key, value, version, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._forget(key, version)
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._forget(key, version)
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version=version) is not MISSING
+
+    def incr(self, key, delta=1, version=None):
+        self._forget(key, version)
+        return self.shared.incr(key, delta, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """Как в Django, но при промахе значение считает один вызов.
+
+        Потоки процесса ждут друг друга на блокировке, воркеры — на
+        ключе-замке в общем кэше. Если вычисляющий воркер не успел за
+        ``LOCK_TIMEOUT``, ожидающие считают значение сами.
+        """
+        value = self.get(key, MISSING, version=version)
+        if value is not MISSING:
+            return value
+        if not callable(default):
+            return super().get_or_set(key, default, timeout, version)
+        with self._flight(self._local_key(key, version)):
+            value = self.get(key, MISSING, version=version)
+            if value is not MISSING:
+                return value
+            lock = "cache-lock:{}".format(self._local_key(key, version))
+            token = uuid.uuid4().hex
+            locked = self.shared.add(lock, token, self.lock_timeout)
+            if not locked:
+                value = self._wait_for(key, version)
+                if value is not MISSING:
+                    return value
+            try:
+                value = default()
+                if value is not None:
+                    self.set(key, value, timeout, version=version)
+                return value
+            finally:
+                # Чужой замок не трогаем: если мы его не взяли или наш
+                # истёк за время пересчёта, его держит другой воркер.
+                if locked and self.shared.get(lock) == token:
+                    self.shared.delete(lock)
+
+    def _flight(self, local_key):
+        with _local_tiers_lock:
+            lock = self._flights.get(local_key)
+            if lock is None:
+                lock = self._flights[local_key] = _FlightLock(
+                    self._flights, local_key)
+            lock.users += 1
+        return lock
+
+    def _wait_for(self, key, version):
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll)
+            value = self.shared.get(key, MISSING, version=version)
+            if value is not MISSING:
+                self._remember(key, value, version)
+                return value
+        return MISSING
+
+    # Метрики
+
+    def flush_stats(self):
+        """Сохраняет счётчики процесса в общий кэш для ``cache_stats``."""
+        self.stats.flushed = time.monotonic()
+        try:
+            self.shared.set(STATS_WORKER_KEY.format(worker_name()),
+                            self.stats.snapshot(), STATS_TIMEOUT)
+            self._workers.register(self.shared)
+        except Exception:
+            logger.exception("Не удалось сохранить метрики кэша")
+
+    def collect_stats(self):
+        """Сумма счётчиков всех воркеров: ``{префикс: {счётчик: число}}``."""
+        self.flush_stats()
+        totals = {}
+        snapshots = self.shared.get_many(
+            [STATS_WORKER_KEY.format(worker)
+             for worker in self._workers.workers(self.shared)])
+        for snapshot in snapshots.values():
+            for prefix, counters in snapshot.items():
+                totals.setdefault(prefix, Counter()).update(counters)
+        return {prefix: {name: counters[name] for name in STATS}
+                for prefix, counters in totals.items()}
+
+    def reset_stats(self):
+        self.stats.reset()
+        self.shared.delete_many(
+            [STATS_WORKER_KEY.format(worker)
+             for worker in self._workers.workers(self.shared)])
+        self._workers.clear(self.shared)
+
+
+class _FlightLock:
+    """Замок на один ключ, который удаляется, когда его никто не ждёт."""
+
+    def __init__(self, flights, key):
+        self.flights = flights
+        self.key = key
+        self.lock = threading.Lock()
+        self.users = 0
+
+    def __enter__(self):
+        self.lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+        with _local_tiers_lock:
+            self.users -= 1
+            if not self.users:
+                self.flights.pop(self.key, None)
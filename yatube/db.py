@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute("PRAGMA {} = {}".format(name, value))
+
+
+@receiver(request_started)
+def check_persistent_connections(sender, **kwargs):
+    """Закрывает «мёртвые» постоянные соединения до начала запроса.
+
+    Django сам проверяет соединение только после ошибки, а сервер базы
+    мог закрыть его по таймауту, пока воркер простаивал.
+    """
+    if not settings.DB_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is not None and \
+                not connection.is_usable():
+            connection.close()
@@ -0,0 +1,56 @@
+import json
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube.cache import STATS
+
+COLUMNS = (
+    ("prefix", 28),
+    ("reads", 10),
+    ("local %", 9),
+    ("shared %", 10),
+    ("miss %", 8),
+    ("sets", 8),
+)
+
+
+class Command(BaseCommand):
+    help = ("Печатает попадания и промахи двухуровневого кэша по "
+            "префиксам ключей, суммируя все воркеры.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--alias", default="default",
+                            help="Имя кэша из настройки CACHES.")
+        parser.add_argument("--json", action="store_true",
+                            help="Вывести счётчики в JSON.")
+        parser.add_argument("--reset", action="store_true",
+                            help="Сбросить накопленные счётчики.")
+
+    def handle(self, *args, **options):
+        cache = caches[options["alias"]]
+        if not hasattr(cache, "collect_stats"):
+            raise CommandError("Кэш {} не ведёт метрик".format(
+                options["alias"]))
+        if options["reset"]:
+            cache.reset_stats()
+            self.stdout.write("Метрики кэша сброшены")
+            return
+        stats = cache.collect_stats()
+        if options["json"]:
+            self.stdout.write(json.dumps(stats, indent=2, sort_keys=True))
+            return
+        self.stdout.write(
+            "".join(title.ljust(width) for title, width in COLUMNS))
+        by_reads = sorted(
+            stats.items(),
+            key=lambda item: -sum(item[1][name] for name in STATS[:3]))
+        for prefix, counters in by_reads:
+            reads = sum(counters[name] for name in STATS[:3])
+            row = (prefix, reads) + tuple(
+                round(100 * counters[name] / reads, 1) if reads else 0
+                for name in STATS[:3]
+            ) + (counters["sets"],)
+            self.stdout.write("".join(
+                str(value).ljust(width)
+                for value, (title, width) in zip(row, COLUMNS)))
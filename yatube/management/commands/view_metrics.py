@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from yatube import metrics
+
+COLUMNS = (
+    ("view", 24),
+    ("requests", 9),
+    ("p50 ms", 8),
+    ("p95 ms", 8),
+    ("max ms", 8),
+    ("queries", 8),
+    ("max q", 6),
+    ("dups", 5),
+    ("sql p95", 8),
+    ("tpl p95", 8),
+)
+
+
+class Command(BaseCommand):
+    help = "Печатает сводку метрик представлений по всем воркерам."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--json", action="store_true",
+                            help="Вывести гистограммы в JSON.")
+        parser.add_argument("--reset", action="store_true",
+                            help="Сбросить накопленные метрики.")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            metrics.clear()
+            self.stdout.write("Метрики сброшены")
+            return
+        views = metrics.collect()
+        if options["json"]:
+            self.stdout.write(json.dumps(
+                {view: {name: histogram.to_dict()
+                        for name, histogram in histograms.items()}
+                 for view, histograms in views.items()},
+                indent=2, sort_keys=True,
+            ))
+            return
+        self.stdout.write(
+            "".join(title.ljust(width) for title, width in COLUMNS))
+        by_requests = sorted(views.items(),
+                             key=lambda item: -item[1]["total_ms"].count)
+        for view, histograms in by_requests:
+            total = histograms["total_ms"]
+            queries = histograms["queries"]
+            row = (
+                view,
+                total.count,
+                total.percentile(0.5),
+                total.percentile(0.95),
+                round(total.maximum, 1),
+                round(queries.mean, 1),
+                queries.maximum,
+                histograms["duplicates"].maximum,
+                histograms["sql_ms"].percentile(0.95),
+                histograms["render_ms"].percentile(0.95),
+            )
+            self.stdout.write("".join(
+                str(value).ljust(width)
+                for value, (title, width) in zip(row, COLUMNS)))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = ("Компилирует все шаблоны проекта. Годится как проверка "
+            "перед выкладкой: ошибка в любом шаблоне завершает команду "
+            "с ненулевым кодом.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count, errors = warm_templates()
+        elapsed = (time.monotonic() - started) * 1000
+        for name, error in sorted(errors.items()):
+            self.stderr.write("{}: {}".format(name, error))
+        if errors:
+            raise CommandError("Шаблонов с ошибками: {}".format(len(errors)))
+        self.stdout.write("Скомпилировано шаблонов: {} за {:.1f} мс"
+                          .format(count, elapsed))
@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .workers import WorkerRegistry, worker_name
+
+logger = logging.getLogger(__name__)
+
+TIME_BOUNDS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+COUNT_BOUNDS = (0, 1, 2, 5, 10, 20, 50, 100)
+METRICS = {
+    "queries": COUNT_BOUNDS,
+    "duplicates": COUNT_BOUNDS,
+    "sql_ms": TIME_BOUNDS,
+    "render_ms": TIME_BOUNDS,
+    "total_ms": TIME_BOUNDS,
+}
+WORKER_KEY = "view-metrics:worker:{}"
+WORKER_TIMEOUT = 60 * 60 * 24
+workers = WorkerRegistry("view-metrics:", WORKER_TIMEOUT)
+
+
+class ViewBudgetExceeded(Exception):
+    pass
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    def __init__(self, bounds, counts=None, count=0, total=0.0, maximum=0):
+        self.bounds = tuple(bounds)
+        self.counts = list(counts or [0] * (len(self.bounds) + 1))
+        self.count = count
+        self.total = total
+        self.maximum = maximum
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other):
+        for number, count in enumerate(other.counts):
+            self.counts[number] += count
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, share):
+        """Верхняя граница корзины, в которую попадает перцентиль."""
+        if not self.count:
+            return 0
+        rank = share * self.count
+        seen = 0
+        for number, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if number < len(self.bounds):
+                    return self.bounds[number]
+                return self.maximum
+        return self.maximum
+
+    def to_dict(self):
+        return {
+            "bounds": self.bounds,
+            "counts": self.counts,
+            "count": self.count,
+            "total": self.total,
+            "maximum": self.maximum,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["bounds"], data["counts"], data["count"],
+                   data["total"], data["maximum"])
+
+
+class Registry:
+    """Метрики представлений этого процесса.
+
+    Снимок периодически сохраняется в кэш под ключом процесса, чтобы
+    команда ``view_metrics`` могла собрать данные всех воркеров.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.flushed = time.monotonic()
+
+    def record(self, view, sample):
+        with self.lock:
+            histograms = self.views.setdefault(
+                view,
+                {name: Histogram(bounds) for name, bounds in METRICS.items()}
+            )
+            for name, value in sample.items():
+                histograms[name].observe(value)
+            due = (time.monotonic() - self.flushed
+                   >= settings.VIEW_METRICS_FLUSH_INTERVAL)
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                view: {name: histogram.to_dict()
+                       for name, histogram in histograms.items()}
+                for view, histograms in self.views.items()
+            }
+
+    def flush(self):
+        self.flushed = time.monotonic()
+        try:
+            cache.set(WORKER_KEY.format(worker_name()), self.snapshot(),
+                      WORKER_TIMEOUT)
+            workers.register(cache)
+        except Exception:
+            logger.exception("Не удалось сохранить метрики представлений")
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+
+registry = Registry()
+
+
+def collect():
+    """Сводные гистограммы по всем воркерам: ``{view: {metric: hist}}``."""
+    views = {}
+    snapshots = cache.get_many(
+        [WORKER_KEY.format(worker) for worker in workers.workers(cache)])
+    for snapshot in snapshots.values():
+        for view, histograms in snapshot.items():
+            merged = views.setdefault(view, {})
+            for name, data in histograms.items():
+                histogram = Histogram.from_dict(data)
+                if name in merged:
+                    merged[name].merge(histogram)
+                else:
+                    merged[name] = histogram
+    return views
+
+
+def clear():
+    registry.reset()
+    cache.delete_many([WORKER_KEY.format(worker)
+                       for worker in workers.workers(cache)])
+    workers.clear(cache)
+
+
+def check_budget(view, sample):
+    budget = settings.VIEW_BUDGETS.get(view)
+    if not budget:
+        return
+    exceeded = [
+        "{} {} > {}".format(name, round(sample[name], 1), limit)
+        for name, limit in budget.items()
+        if sample.get(name, 0) > limit
+    ]
+    if not exceeded:
+        return
+    message = "Представление {} превысило бюджет: {}".format(
+        view, ", ".join(exceeded))
+    if settings.VIEW_BUDGET_ACTION == "raise":
+        raise ViewBudgetExceeded(message)
+    logger.warning(message)
+
+
+_render = threading.local()
+
+
+@contextmanager
+def measure_templates():
+    """Считает время рендеринга шаблонов в этом потоке внутри блока.
+
+    Возвращает функцию, которая отдаёт накопленное время в секундах.
+    Вне блока обёртка ``Template.render`` ничего не замеряет.
+    """
+    _render.active = True
+    _render.depth = 0
+    _render.total = 0.0
+    try:
+        yield lambda: _render.total
+    finally:
+        _render.active = False
+
+
+def instrument_templates():
+    """Оборачивает рендеринг шаблонов Django, считая только внешний вызов."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, "instrumented", False):
+        return
+    render = Template.render
+
+    def timed_render(self, *args, **kwargs):
+        if not getattr(_render, "active", False):
+            return render(self, *args, **kwargs)
+        _render.depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            _render.depth -= 1
+            if not _render.depth:
+                _render.total += time.perf_counter() - started
+
+    timed_render.instrumented = True
+    Template.render = timed_render
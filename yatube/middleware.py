@@ -0,0 +1,79 @@
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+
+class QueryTracker:
+    """Обёртка ``execute_wrapper``: считает запросы, их время и повторы."""
+
+    def __init__(self):
+        self.statements = Counter()
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.statements[(sql, repr(params))] += 1
+
+    @property
+    def count(self):
+        return sum(self.statements.values())
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values()
+                   if count > 1)
+
+
+def server_timing(sample):
+    return ", ".join((
+        'db;dur={:.1f};desc="{} queries, {} duplicates"'.format(
+            sample["sql_ms"], sample["queries"], sample["duplicates"]),
+        "tpl;dur={:.1f}".format(sample["render_ms"]),
+        "total;dur={:.1f}".format(sample["total_ms"]),
+    ))
+
+
+class ViewMetricsMiddleware:
+    """Замеряет запросы к базе, рендеринг шаблонов и полное время ответа.
+
+    Метрики копятся по имени URL, а сводка по текущему запросу
+    уходит клиенту в заголовке ``Server-Timing``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if settings.VIEW_METRICS_ENABLED:
+            metrics.instrument_templates()
+
+    def __call__(self, request):
+        if not settings.VIEW_METRICS_ENABLED:
+            return self.get_response(request)
+        tracker = QueryTracker()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            render_time = stack.enter_context(metrics.measure_templates())
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(tracker))
+            response = self.get_response(request)
+        sample = {
+            "queries": tracker.count,
+            "duplicates": tracker.duplicates,
+            "sql_ms": tracker.duration * 1000,
+            "render_ms": render_time() * 1000,
+            "total_ms": (time.perf_counter() - started) * 1000,
+        }
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        metrics.registry.record(view, sample)
+        response["Server-Timing"] = server_timing(sample)
+        metrics.check_budget(view, sample)
+        return response
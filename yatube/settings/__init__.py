@@ -0,0 +1,13 @@
+"""Настройки проекта.
+
+По умолчанию подключаются настройки разработки, ``YATUBE_ENV=prod``
+включает боевые. Модуль можно указать и напрямую:
+``DJANGO_SETTINGS_MODULE=yatube.settings.prod``. Тесты работают
+с ``yatube.settings.test``.
+"""
+import os
+
+if os.environ.get("YATUBE_ENV", "dev") == "prod":
+    from .prod import *  # noqa: F401,F403
+else:
+    from .dev import *  # noqa: F401,F403
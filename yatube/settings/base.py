@@ -0,0 +1,329 @@
+"""
+Django settings for yatube project.
+
+Generated by 'django-admin startproject' using Django 2.2.
+Общие настройки; отличия разработки и боевого окружения — в dev.py
+и prod.py.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+import tempfile
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'o7f0s^(w(3k4v7+i@ijtw=vu#6(5dge8uytvx=v8#1e$dzsie!'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    "localhost",
+    "127.0.0.1",
+    "[::1]",
+    "testserver",
+]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'users',
+    'posts',
+    'about',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'sorl.thumbnail',
+    'yatube.apps.YatubeConfig',
+]
+
+MIDDLEWARE = [
+    'yatube.middleware.ViewMetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'posts.context_processors.feed_cache',
+            ],
+        },
+    },
+]
+
+# Компилировать шаблоны из DIRS при старте WSGI-приложения.
+TEMPLATES_WARM_UP = False
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+# Профиль базы выбирается переменной окружения YATUBE_DB_PROFILE:
+# dev (по умолчанию), sqlite (боевой SQLite в режиме WAL) или server
+# (PostgreSQL/MySQL с постоянными соединениями).
+
+DB_PROFILE = os.environ.get('YATUBE_DB_PROFILE', 'dev')
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('YATUBE_DB_NAME',
+                               os.path.join(BASE_DIR, 'db.sqlite3')),
+    }
+}
+
+# PRAGMA, которые выполняются на каждом новом соединении с SQLite.
+SQLITE_PRAGMAS = {}
+
+# Проверять постоянные соединения перед обработкой запроса.
+DB_HEALTH_CHECKS = False
+
+if DB_PROFILE == 'sqlite':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {'timeout': 20},
+    })
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    }
+elif DB_PROFILE == 'server':
+    DATABASES['default'] = {
+        'ENGINE': os.environ.get('YATUBE_DB_ENGINE',
+                                 'django.db.backends.postgresql'),
+        'NAME': os.environ.get('YATUBE_DB_NAME', 'yatube'),
+        'USER': os.environ.get('YATUBE_DB_USER', ''),
+        'PASSWORD': os.environ.get('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.environ.get('YATUBE_DB_HOST', ''),
+        'PORT': os.environ.get('YATUBE_DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 600)),
+    }
+    DB_HEALTH_CHECKS = True
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, "static")
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get('YATUBE_MEDIA_ROOT',
+                            os.path.join(BASE_DIR, 'media'))
+
+
+#Login
+
+LOGIN_URL = "/auth/login/"
+LOGIN_REDIRECT_URL = "index"
+LOGOUT_REDIRECT_URL = "index"
+
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
+
+# Двухуровневый кэш: LRU в памяти воркера перед общим для всех воркеров
+# кэшем. Версии лент и метрики читаются только из общего уровня,
+# остальное живёт в памяти не дольше LOCAL_TIMEOUT секунд.
+#
+# Общий уровень лучше держать в memcached (YATUBE_MEMCACHED — адреса
+# серверов через запятую): запись и add там O(1). Без него используется
+# файловый кэш, который проверяет размер каталога не чаще раза в
+# CULL_INTERVAL секунд, а не на каждой записи.
+CACHE_DIR = os.environ.get('YATUBE_CACHE_DIR',
+                           os.path.join(tempfile.gettempdir(),
+                                        'yatube_cache'))
+if os.environ.get('YATUBE_MEMCACHED'):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ['YATUBE_MEMCACHED'].split(','),
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'yatube.cache.FileCache',
+        'LOCATION': CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 100000, 'CULL_INTERVAL': 60},
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'yatube.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': SHARED_CACHE,
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+            'SHARED_ONLY_PREFIXES': [
+                'feed-version:',
+                'view-metrics:',
+                'cache-metrics:',
+                'cache-lock:',
+            ],
+        },
+    }
+}
+
+PER_PAGE = 10
+# Групп на странице каталога.
+GROUPS_PER_PAGE = 50
+# Комментарии под постом подгружаются страницами такого размера.
+COMMENTS_PER_PAGE = 20
+# Наибольший размер страницы и число комментариев в JSON API.
+API_MAX_LIMIT = 100
+# Сколько строк выгрузки из админки читается из базы за раз.
+EXPORT_CHUNK_SIZE = 2000
+# Списки админки не считают строки дальше этого предела: на больших
+# таблицах число берётся из статистики базы.
+ADMIN_COUNT_LIMIT = 10000
+
+# Лента подписок
+
+TIMELINE_SIZE = 800
+TIMELINE_FANOUT_LIMIT = 1000
+# Правки постов и комментарии автора сбрасывают ленты его подписчиков
+# одной задачей раз в столько секунд.
+TIMELINE_REFRESH_INTERVAL = 10
+
+# Фрагменты лент сбрасываются по версиям, поэтому их можно хранить долго.
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# Фрагмент пересчитывает один запрос, остальные тем временем получают
+# прошлую версию. FEED_CACHE_BETA > 1 пересчитывает раньше срока чаще,
+# FEED_CACHE_LOCK_TIMEOUT ограничивает ожидание пересчёта.
+FEED_CACHE_BETA = 1.0
+FEED_CACHE_LOCK_TIMEOUT = 10
+
+# Гостевые страницы лент и постов прокси и браузер могут отдавать сами,
+# обновляя их в фоне, пока ответ не старше суммы этих значений.
+PAGE_CACHE_MAX_AGE = 30
+PAGE_STALE_WHILE_REVALIDATE = 300
+
+# Популярное: новый пост и комментарий прибавляют вес к счёту поста
+# и группы, вклад события уменьшается вдвое за TRENDING_HALF_LIFE.
+# Затухание выполняет воркер очереди раз в TRENDING_DECAY_INTERVAL,
+# счета меньше TRENDING_MIN_SCORE удаляются.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_DECAY_INTERVAL = 10 * 60
+TRENDING_POST_WEIGHT = 3.0
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_MIN_SCORE = 0.1
+TRENDING_GROUPS = 10
+
+# Рекомендации авторов: друзья друзей и совместные подписки. Для
+# каждого пользователя хранится RECOMMENDATIONS_SIZE кандидатов, на
+# страницах показывается RECOMMENDATIONS_SHOWN. Соседи автора ищутся
+# среди RECOMMENDATIONS_SAMPLE его последних подписчиков, от каждой
+# подписки берётся не больше RECOMMENDATIONS_FANOUT авторов.
+# Новые подписки досчитываются сразу, а отписки учитывает только
+# полный пересчёт, который воркер очереди выполняет раз в
+# RECOMMENDATIONS_REBUILD_INTERVAL.
+RECOMMENDATIONS_SIZE = 20
+RECOMMENDATIONS_SHOWN = 5
+RECOMMENDATIONS_SAMPLE = 20
+RECOMMENDATIONS_NEIGHBOURS = 10
+RECOMMENDATIONS_FANOUT = 200
+RECOMMENDATIONS_FRIEND_WEIGHT = 1.0
+RECOMMENDATIONS_COFOLLOW_WEIGHT = 2.0
+RECOMMENDATIONS_REBUILD_INTERVAL = 60 * 60
+
+# Превью картинок постов готовятся в фоне после сохранения поста.
+POST_THUMBNAIL_SIZES = ("960x339", "480x170")
+
+# Очередь фоновых задач в базе: раскладка постов по лентам, поисковый
+# индекс, превью. Задачи выполняет воркер ``manage.py run_jobs``,
+# а с JOBS_INLINE выполняются сразу при постановке в очередь.
+JOBS_INLINE = False
+JOB_WORKERS = 4
+JOB_MAX_ATTEMPTS = 5
+# Пауза перед повтором удваивается с каждой неудачной попыткой.
+JOB_RETRY_DELAY = 10
+JOB_LOCK_TIMEOUT = 10 * 60
+JOB_RETENTION = 60 * 60 * 24 * 7
+
+# Метрики представлений: число запросов, повторы, время SQL, шаблонов
+# и ответа целиком. Бюджеты задаются по имени URL; при превышении
+# пишется предупреждение в лог или бросается исключение ('raise').
+VIEW_METRICS_ENABLED = True
+VIEW_METRICS_FLUSH_INTERVAL = 10
+VIEW_BUDGETS = {
+    'index': {'queries': 10, 'duplicates': 0},
+    'group': {'queries': 10, 'duplicates': 0},
+    'groups': {'queries': 4, 'duplicates': 0},
+    'trending': {'queries': 6, 'duplicates': 0},
+    'profile': {'queries': 12, 'duplicates': 0},
+    'post': {'queries': 12, 'duplicates': 0},
+    'follow_index': {'queries': 10, 'duplicates': 0},
+    'post_comments': {'queries': 6, 'duplicates': 0},
+    'search': {'queries': 10, 'duplicates': 0},
+}
+VIEW_BUDGET_ACTION = 'log'
@@ -0,0 +1,8 @@
+"""Настройки для разработки и тестов.
+
+Шаблоны читаются с диска при каждом рендеринге, поэтому правки видны
+сразу, без перезапуска сервера.
+"""
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
@@ -0,0 +1,33 @@
+"""Боевые настройки.
+
+Секретный ключ и разрешённые хосты берутся из окружения:
+``YATUBE_SECRET_KEY`` и ``YATUBE_ALLOWED_HOSTS`` (через запятую).
+"""
+import copy
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ["YATUBE_SECRET_KEY"]
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get("YATUBE_ALLOWED_HOSTS", "").split(",")
+    if host.strip()
+]
+
+# Скомпилированные шаблоны хранятся в памяти процесса и не читаются
+# с диска повторно. Со списком загрузчиков APP_DIRS указывать нельзя.
+TEMPLATES = copy.deepcopy(TEMPLATES)
+TEMPLATES[0]["APP_DIRS"] = False
+TEMPLATES[0]["OPTIONS"]["loaders"] = [
+    ("django.template.loaders.cached.Loader", [
+        "django.template.loaders.filesystem.Loader",
+        "django.template.loaders.app_directories.Loader",
+    ]),
+]
+# Воркер компилирует все шаблоны проекта при старте, а не на первых
+# запросах пользователей.
+TEMPLATES_WARM_UP = True
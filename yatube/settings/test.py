@@ -0,0 +1,36 @@
+"""Настройки тестов.
+
+Общий уровень кэша в памяти, чтобы прогоны не делили файлы, задачи
+очереди выполняются сразу, а превышение бюджета запросов роняет тест.
+Загруженные в тестах картинки и их превью пишутся во временный
+каталог, а не в ``media/`` проекта.
+``manage.py test`` и pytest подключают этот модуль сами.
+"""
+import atexit
+import copy
+import os
+import shutil
+import tempfile
+
+from .dev import *  # noqa: F401,F403
+from .dev import CACHES, DATABASES
+
+CACHES = copy.deepcopy(CACHES)
+CACHES["default"]["OPTIONS"]["SHARED"] = {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "yatube-tests",
+}
+
+# Воркеры очереди в тестах работают в потоках. Общая база SQLite в
+# памяти блокирует таблицы целиком и не ждёт освобождения, поэтому
+# тестовая база лежит в файле.
+DATABASES = copy.deepcopy(DATABASES)
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"]["TEST"] = {"NAME": os.path.join(
+        tempfile.gettempdir(), "yatube-test-{}.sqlite3".format(os.getpid()))}
+
+JOBS_INLINE = True
+VIEW_BUDGET_ACTION = "raise"
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix="yatube-test-media-")
+atexit.register(shutil.rmtree, MEDIA_ROOT, ignore_errors=True)
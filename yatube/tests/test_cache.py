@@ -0,0 +1,146 @@
+import itertools
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from yatube.cache import FileCache, TieredCache
+
+_names = itertools.count()
+
+
+def tiered_cache(**options):
+    name = "tiered-test-{}".format(next(_names))
+    options.setdefault("SHARED", {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": name,
+    })
+    options.setdefault("SHARED_ONLY_PREFIXES", ["version:"])
+    return TieredCache(name, {"OPTIONS": options})
+
+
+class TieredCacheTest(SimpleTestCase):
+    def test_local_tier_serves_until_timeout(self):
+        """ Локальный уровень отвечает, пока не истёк его срок """
+        cache = tiered_cache(LOCAL_TIMEOUT=0.05)
+        cache.set("fragment:1", "cached")
+        cache.shared.delete("fragment:1")
+        self.assertEqual(cache.get("fragment:1"), "cached")
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("fragment:1"))
+
+    def test_versions_always_read_from_shared(self):
+        """ Версии читаются из общего уровня: сброс виден всем воркерам """
+        shared = {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "tiered-test-shared",
+        }
+        worker, other_worker = tiered_cache(SHARED=shared), \
+            tiered_cache(SHARED=shared)
+        worker.set("version:feed", 1)
+        worker.set("fragment:feed", "old")
+        other_worker.set("version:feed", 2)
+        other_worker.set("fragment:feed", "new")
+        self.assertEqual(worker.get("version:feed"), 2)
+        # Изменяемые ключи без версии видны с задержкой LOCAL_TIMEOUT.
+        self.assertEqual(worker.get("fragment:feed"), "old")
+
+    def test_local_tier_is_bounded(self):
+        """ Локальный уровень вытесняет давно не читанные ключи """
+        cache = tiered_cache(LOCAL_MAX_ENTRIES=2)
+        for number in range(3):
+            cache.set("key:{}".format(number), number)
+        self.assertEqual(len(cache.local.entries), 2)
+        self.assertEqual(cache.get("key:0"), 0)
+        self.assertEqual(cache.stats.snapshot()["key"]["shared_hits"], 1)
+
+    def test_get_or_set_computes_once(self):
+        """ При промахе значение считает один поток из многих """
+        cache = tiered_cache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return "page"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    cache.get_or_set("page:index", compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["page"] * 8)
+
+    def test_get_or_set_waits_for_other_worker(self):
+        """ Пока другой воркер держит замок, значение не считается заново """
+        cache = tiered_cache(LOCK_POLL=0.01)
+        lock = "cache-lock:{}".format(cache.shared.make_key("page:index"))
+        cache.shared.add(lock, 1)
+        timer = threading.Timer(
+            0.05, cache.shared.set, ["page:index", "from other worker"])
+        timer.start()
+        value = cache.get_or_set("page:index", lambda: "recomputed")
+        timer.join()
+        self.assertEqual(value, "from other worker")
+
+    def test_get_or_set_keeps_foreign_lock(self):
+        """ Замок другого воркера не удаляется после пересчёта """
+        cache = tiered_cache(LOCK_POLL=0.01, LOCK_TIMEOUT=0.03)
+        lock = "cache-lock:{}".format(cache.shared.make_key("page:index"))
+        cache.shared.add(lock, "other worker")
+        self.assertEqual(cache.get_or_set("page:index", lambda: "page"),
+                         "page")
+        self.assertEqual(cache.shared.get(lock), "other worker")
+
+    def test_stats_command(self):
+        """ Команда cache_stats показывает попадания по префиксам """
+        cache = tiered_cache()
+        cache.set("post-card:1", "card")
+        cache.get("post-card:1")
+        cache.get("post-card:2")
+        stats = cache.collect_stats()
+        self.assertEqual(stats["post-card"]["local_hits"], 1)
+        self.assertEqual(stats["post-card"]["misses"], 1)
+        out = StringIO()
+        call_command("cache_stats", stdout=out)
+        self.assertIn("prefix", out.getvalue())
+
+
+class FileCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def file_cache(self, **options):
+        return FileCache(self.dir, {"OPTIONS": options})
+
+    def test_add_is_exclusive(self):
+        """ add не перезаписывает живую запись и заменяет просроченную """
+        cache = self.file_cache()
+        self.assertTrue(cache.add("lock", "first", 0.05))
+        self.assertFalse(cache.add("lock", "second"))
+        self.assertEqual(cache.get("lock"), "first")
+        time.sleep(0.06)
+        self.assertTrue(cache.add("lock", "third"))
+        self.assertEqual(cache.get("lock"), "third")
+
+    def test_culls_once_per_interval(self):
+        """ Каталог кэша читается не на каждой записи """
+        cache = self.file_cache(MAX_ENTRIES=2, CULL_INTERVAL=60)
+        with mock.patch.object(cache, "_list_cache_files",
+                               wraps=cache._list_cache_files) as listed:
+            for number in range(10):
+                cache.set("key:{}".format(number), number)
+        self.assertEqual(listed.call_count, 1)
@@ -0,0 +1,98 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from yatube import metrics, workers
+
+INDEX_URL = reverse("index")
+
+
+class ViewMetricsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.clear()
+        self.guest_client = Client()
+
+    def test_server_timing_header(self):
+        """ Ответ содержит заголовок Server-Timing """
+        response = self.guest_client.get(INDEX_URL)
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+    def test_metrics_recorded_by_view_name(self):
+        """ Метрики копятся по имени представления """
+        self.guest_client.get(INDEX_URL)
+        self.guest_client.get(INDEX_URL)
+        histograms = metrics.registry.views["index"]
+        self.assertEqual(histograms["total_ms"].count, 2)
+        self.assertGreater(histograms["queries"].maximum, 0)
+        self.assertGreater(histograms["render_ms"].total, 0)
+
+    @override_settings(VIEW_BUDGETS={"index": {"queries": 0}},
+                       VIEW_BUDGET_ACTION="raise")
+    def test_budget_exceeded_fails_request(self):
+        """ Превышение бюджета в тестах приводит к исключению """
+        with self.assertRaises(metrics.ViewBudgetExceeded):
+            self.guest_client.get(INDEX_URL)
+
+    @override_settings(VIEW_BUDGETS={"index": {"queries": 0}},
+                       VIEW_BUDGET_ACTION="log")
+    def test_budget_exceeded_logged(self):
+        """ Вне тестов превышение бюджета пишется в лог """
+        with self.assertLogs("yatube.metrics", "WARNING"):
+            response = self.guest_client.get(INDEX_URL)
+        self.assertEqual(response.status_code, 200)
+
+    def test_view_metrics_command(self):
+        """ Команда view_metrics печатает сводку по представлениям """
+        self.guest_client.get(INDEX_URL)
+        metrics.registry.flush()
+        out = StringIO()
+        call_command("view_metrics", stdout=out)
+        self.assertIn("index", out.getvalue())
+
+
+class HistogramTest(TestCase):
+    def test_percentile_and_merge(self):
+        """ Перцентиль берётся по границам корзин, гистограммы сливаются """
+        first = metrics.Histogram(metrics.TIME_BOUNDS)
+        for value in (3, 4, 40):
+            first.observe(value)
+        second = metrics.Histogram.from_dict(first.to_dict())
+        first.merge(second)
+        self.assertEqual(first.count, 6)
+        self.assertEqual(first.percentile(0.5), 5)
+        self.assertEqual(first.percentile(1), 50)
+
+
+class WorkerRegistryTest(TestCase):
+    def setUp(self):
+        self.registry = workers.WorkerRegistry("tests-workers:", 60)
+        self.registry.clear(cache)
+
+    def test_workers_take_separate_slots(self):
+        """ Воркеры регистрируются в своих слотах и не теряют друг друга """
+        other = workers.WorkerRegistry("tests-workers:", 60)
+        with mock.patch("yatube.workers.worker_name", return_value="a"):
+            self.registry.register(cache)
+        with mock.patch("yatube.workers.worker_name", return_value="b"):
+            other.register(cache)
+            other.register(cache)
+        self.assertEqual(self.registry.workers(cache), {"a", "b"})
+        self.assertNotEqual(self.registry.slot, other.slot)
+
+
+class TemplateTimingTest(TestCase):
+    def test_templates_timed_only_inside_block(self):
+        """ Рендеринг вне замера не учитывается """
+        metrics.instrument_templates()
+        render_to_string("misc/500.html")
+        with metrics.measure_templates() as render_time:
+            self.assertEqual(render_time(), 0)
+            render_to_string("misc/500.html")
+            self.assertGreater(render_time(), 0)
@@ -0,0 +1,76 @@
+import copy
+import importlib
+import os
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from yatube.warmup import template_names, warm_templates
+
+CACHED_LOADER = "django.template.loaders.cached.Loader"
+
+
+def import_prod_settings():
+    with mock.patch.dict(os.environ, {"YATUBE_SECRET_KEY": "secret",
+                                      "YATUBE_ALLOWED_HOSTS": "a.ru, b.ru"}):
+        sys.modules.pop("yatube.settings.prod", None)
+        return importlib.import_module("yatube.settings.prod")
+
+
+class SettingsTest(SimpleTestCase):
+    def test_prod_uses_cached_loader(self):
+        """ Боевые настройки кэшируют скомпилированные шаблоны """
+        prod = import_prod_settings()
+        options = prod.TEMPLATES[0]["OPTIONS"]
+        self.assertFalse(prod.DEBUG)
+        self.assertFalse(prod.TEMPLATES[0]["APP_DIRS"])
+        self.assertEqual(options["loaders"][0][0], CACHED_LOADER)
+        self.assertEqual(prod.ALLOWED_HOSTS, ["a.ru", "b.ru"])
+        self.assertTrue(prod.TEMPLATES_WARM_UP)
+
+    def test_prod_does_not_change_dev_settings(self):
+        """ Боевые настройки не меняют общий список TEMPLATES """
+        import_prod_settings()
+        self.assertNotIn("loaders", settings.TEMPLATES[0]["OPTIONS"])
+
+
+class WarmTemplatesTest(SimpleTestCase):
+    def test_all_project_templates_compiled(self):
+        """ Команда компилирует все шаблоны из каталога templates """
+        names = list(template_names(settings.TEMPLATES_DIR))
+        out = StringIO()
+        call_command("warm_templates", stdout=out)
+        self.assertIn("posts/index.html", names)
+        self.assertIn(str(len(names)), out.getvalue())
+
+    def test_cached_loader_filled(self):
+        """ После прогрева кэширующий загрузчик хранит все шаблоны """
+        templates = copy.deepcopy(settings.TEMPLATES)
+        templates[0]["APP_DIRS"] = False
+        templates[0]["OPTIONS"]["loaders"] = [
+            (CACHED_LOADER, ["django.template.loaders.filesystem.Loader"]),
+        ]
+        with override_settings(TEMPLATES=templates):
+            count, errors = warm_templates()
+            loader = engines["django"].engine.template_loaders[0]
+            self.assertEqual(errors, {})
+            self.assertEqual(len(loader.get_template_cache), count)
+
+    def test_broken_template_fails_command(self):
+        """ Ошибка в шаблоне завершает команду с ошибкой """
+        templates = copy.deepcopy(settings.TEMPLATES)
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "broken.html"), "w") as file:
+                file.write("{% if %}")
+            templates[0]["DIRS"] = [directory]
+            with override_settings(TEMPLATES=templates), \
+                    self.assertLogs("yatube.warmup", "ERROR"):
+                with self.assertRaises(CommandError):
+                    call_command("warm_templates", stdout=StringIO(),
+                                 stderr=StringIO())
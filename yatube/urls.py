@@ -28,6 +28,7 @@ urlpatterns = [
     path("about/", include("about.urls", namespace="about")),
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
+    path("api/v1/", include("posts.api.urls", namespace="api")),
     path("", include("posts.urls")),
 ]
 
@@ -0,0 +1,42 @@
+"""Предварительная компиляция шаблонов.
+
+С кэширующим загрузчиком скомпилированный шаблон живёт в памяти
+процесса, поэтому прогрев выполняется в каждом воркере при старте.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(directory):
+    """Имена всех шаблонов в каталоге относительно него самого."""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith((".html", ".txt")):
+                path = os.path.relpath(os.path.join(root, filename),
+                                       directory)
+                yield path.replace(os.sep, "/")
+
+
+def warm_templates():
+    """Компилирует шаблоны из ``DIRS``; возвращает ``(число, ошибки)``."""
+    count, errors = 0, {}
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for directory in engine.dirs:
+            for name in template_names(directory):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError as error:
+                    errors[name] = error
+                    logger.error("Шаблон %s не компилируется: %s",
+                                 name, error)
+                else:
+                    count += 1
+    return count, errors
@@ -0,0 +1,52 @@
+"""Список воркеров в общем кэше для сбора метрик со всех процессов.
+
+Общий ключ со множеством воркеров пришлось бы читать и перезаписывать,
+и одновременные записи теряли бы друг друга. Вместо этого каждый
+воркер занимает свой слот атомарным ``add``, а чтение списка — это
+один ``get_many`` по всем слотам.
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 256
+
+
+def worker_name():
+    return "{}:{}".format(os.uname().nodename, os.getpid())
+
+
+class WorkerRegistry:
+    def __init__(self, prefix, timeout):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.slot = None
+
+    def slot_key(self, number):
+        return "{}slot:{}".format(self.prefix, number)
+
+    def slot_keys(self):
+        return [self.slot_key(number) for number in range(MAX_WORKERS)]
+
+    def register(self, cache):
+        """Занимает слот этого процесса или продлевает занятый."""
+        worker = worker_name()
+        if self.slot is not None:
+            key = self.slot_key(self.slot)
+            if cache.get(key) == worker:
+                cache.set(key, worker, self.timeout)
+                return
+        for number in range(MAX_WORKERS):
+            if cache.add(self.slot_key(number), worker, self.timeout):
+                self.slot = number
+                return
+        self.slot = None
+        logger.warning("Нет свободного слота для воркера %s", worker)
+
+    def workers(self, cache):
+        return set(cache.get_many(self.slot_keys()).values())
+
+    def clear(self, cache):
+        cache.delete_many(self.slot_keys())
+        self.slot = None